@@ -0,0 +1,144 @@
+# answer_key.py
+"""
+Corrigé compilé de chaque exercice QCM, gardé en mémoire.
+
+Le corrigé d'un exercice est lu une fois (une requête sur qcms et
+qcm_reponses) puis conservé sous forme de dictionnaire
+code de question normalisé -> lettres correctes, avec les textes à afficher.
+La correction d'une copie (get_correct_answers_count, /correct-exam/) et
+l'analyse des items n'ont plus qu'à lire les réponses de l'élève.
+
+Les codes sont normalisés à l'écriture (normalize_code : espaces retirés,
+majuscules) dans qcms.code_question, qcm_reponses.code_lettre,
+soumissions.code_question et soumissions.code_reponse ; la notation par lot
+les compare directement en SQL.
+
+Le cache est un LRU de ANSWER_KEY_CACHE_MAX_ENTRIES exercices, propre à
+chaque processus. append_qcm_questions l'invalide ; dans les autres
+processus, un corrigé complété est relu au plus tard après
+ANSWER_KEY_CACHE_TTL_SECONDS.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import text
+
+ANSWER_KEY_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_KEY_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_KEY_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", "600"))
+
+# Une question du corrigé : code et énoncé affichés, lettres proposées et
+# lettres correctes (normalisées), réponses correctes (lettre, texte) affichées
+AnswerKeyEntry = namedtuple(
+    "AnswerKeyEntry", ["id_qcm", "question", "options", "letters", "answers"]
+)
+
+
+def normalize_code(value):
+    """Question code or answer letter as stored in the code_* columns"""
+    if value is None:
+        return None
+    return str(value).strip().upper()
+
+
+class AnswerKey:
+    """Answer key of one exercise, {normalized question code: AnswerKeyEntry}"""
+
+    def __init__(self, exercise_id, entries):
+        self.exercise_id = exercise_id
+        self.entries = entries
+
+    def is_correct(self, code_question, code_reponse):
+        entry = self.entries.get(code_question)
+        return entry is not None and code_reponse in entry.letters
+
+    def score(self, answers):
+        """Number of correct answers among (code_question, code_reponse) pairs"""
+        return sum(1 for code_question, code_reponse in answers if self.is_correct(code_question, code_reponse))
+
+    def correct_answers(self):
+        """Correct answers in the format of get_correct_answers"""
+        return [
+            {"id_qcm": entry.id_qcm, "question": entry.question, "correct_answer": texte, "lettre": lettre}
+            for entry in self.entries.values()
+            for lettre, texte in entry.answers
+        ]
+
+
+def load_answer_key(db, exercise_id):
+    """Compile the answer key of an exercise from qcms and qcm_reponses"""
+    rows = db.execute(text("""
+        SELECT q.exercice_qcm_id, q.code_question, q.question,
+               r.lettre, r.code_lettre, r.texte, r.est_correct
+        FROM qcms q
+        LEFT JOIN qcm_reponses r ON r.qcm_id = q.id
+        WHERE q.exercice_id = :exercise_id
+        ORDER BY q.id, r.id
+    """), {"exercise_id": exercise_id}).fetchall()
+
+    # Codes en double : la première question garde l'énoncé, les lettres sont cumulées
+    collected = OrderedDict()
+    for row in rows:
+        if row.code_question not in collected:
+            collected[row.code_question] = (row.exercice_qcm_id, row.question, [], [], [])
+        _, _, options, letters, answers = collected[row.code_question]
+        if row.code_lettre is None:
+            continue
+        if row.code_lettre not in options:
+            options.append(row.code_lettre)
+        if row.est_correct:
+            if row.code_lettre not in letters:
+                letters.append(row.code_lettre)
+            answers.append((row.lettre, row.texte))
+
+    entries = OrderedDict(
+        (code, AnswerKeyEntry(id_qcm, question, tuple(options), tuple(letters), tuple(answers)))
+        for code, (id_qcm, question, options, letters, answers) in collected.items()
+    )
+    return AnswerKey(exercise_id, entries)
+
+
+class AnswerKeyCache:
+    def __init__(self, max_entries=1024, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # exercice_id -> (AnswerKey, expiration)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db, exercise_id):
+        """Answer key of an exercise, loaded with db on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(exercise_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(exercise_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        answer_key = load_answer_key(db, exercise_id)
+        with self._lock:
+            self._entries[exercise_id] = (answer_key, now + self.ttl_seconds)
+            self._entries.move_to_end(exercise_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return answer_key
+
+    def invalidate(self, *exercise_ids):
+        with self._lock:
+            for exercise_id in exercise_ids:
+                self._entries.pop(exercise_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+answer_key_cache = AnswerKeyCache(
+    max_entries=ANSWER_KEY_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_KEY_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,126 @@
+# answer_sheet.py
+"""
+Lecture déterministe des copies tapées sur le modèle EducAI :
+
+    Nom : Martin Dupont
+    ID Élève : 1
+    ID Exercice : 5
+    Date : 2025-03-24
+    Réponses :
+    Q1 : C
+    Q2 : B
+
+Le résultat a la même structure que celle produite par l'agent d'extraction
+LLM et attendue par insert_submission_data.
+"""
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+# Confiance minimale (0 à 1) pour se passer du LLM
+ANSWER_SHEET_MIN_CONFIDENCE = float(os.getenv("ANSWER_SHEET_MIN_CONFIDENCE", "1.0"))
+
+VALID_LETTERS = {"A", "B", "C", "D"}
+
+_NAME_RE = re.compile(r"^[ \t]*Nom[ \t]*:[ \t]*(\S.*?)[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_STUDENT_ID_RE = re.compile(r"^[ \t]*ID[ \t]*[ÉE]l[èe]ve[ \t]*:\s*(\d+)", re.IGNORECASE | re.MULTILINE)
+_EXERCISE_ID_RE = re.compile(r"^[ \t]*ID[ \t]*Exercice[ \t]*:\s*(\d+)", re.IGNORECASE | re.MULTILINE)
+_DATE_RE = re.compile(r"^[ \t]*Date[ \t]*:\s*([\d/.-]+)", re.IGNORECASE | re.MULTILINE)
+_ANSWERS_HEADER_RE = re.compile(r"^[ \t]*R[ée]ponses[ \t]*:?[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_ANSWER_LINE_RE = re.compile(
+    r"^(?:Q(?:uestion)?[ \t]*)?(\d{1,3})[ \t]*[.:)\-][ \t]*([A-Za-z])[ \t]*$",
+    re.IGNORECASE,
+)
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+
+
+def _parse_date(value):
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def parse_answer_sheet(text):
+    """
+    Parse a machine-readable answer sheet.
+
+    Args:
+        text (str): Text extracted from the PDF by fitz
+
+    Returns:
+        tuple: (structured_data, confidence). structured_data is None when the
+               mandatory fields cannot be found; confidence is in [0, 1].
+    """
+    if not text:
+        return None, 0.0
+    # fitz encadre chaque ligne de caractères de formatage invisibles (U+202D / U+202C)
+    text = "".join(c for c in unicodedata.normalize("NFC", text) if unicodedata.category(c) != "Cf")
+
+    name = _NAME_RE.search(text)
+    student_id = _STUDENT_ID_RE.search(text)
+    exercise_id = _EXERCISE_ID_RE.search(text)
+    date = _DATE_RE.search(text)
+    if not (name and student_id and exercise_id):
+        return None, 0.0
+
+    header = _ANSWERS_HEADER_RE.search(text)
+    answer_block = text[header.end():] if header else text
+
+    id_exercice = int(exercise_id.group(1))
+    reponses = []
+    unparsed = 0
+    for line in answer_block.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _ANSWER_LINE_RE.match(line)
+        if not match:
+            # Sans en-tête "Réponses", les autres lignes de la copie sont attendues
+            if header:
+                unparsed += 1
+            continue
+        reponses.append({
+            "id_exercice": id_exercice,
+            "question": f"Q{int(match.group(1))}",
+            "reponse_choisie": match.group(2).upper(),
+        })
+
+    if not reponses:
+        return None, 0.0
+
+    date_soumission = _parse_date(date.group(1)) if date else None
+    data = {
+        "id_eleve": int(student_id.group(1)),
+        "nom_eleve": name.group(1),
+        "id_exercice": id_exercice,
+        "date_soumission": date_soumission or datetime.now().strftime("%Y-%m-%d"),
+        "reponses": reponses,
+    }
+
+    # Chaque contrôle raté fait baisser la confiance
+    questions = [int(r["question"][1:]) for r in reponses]
+    checks = [
+        header is not None,
+        date_soumission is not None,
+        unparsed == 0,
+        all(r["reponse_choisie"] in VALID_LETTERS for r in reponses),
+        len(set(questions)) == len(questions),
+        sorted(questions) == list(range(1, len(questions) + 1)),
+    ]
+    confidence = sum(checks) / len(checks)
+    return data, confidence
+
+
+def parse_answer_sheet_if_confident(text, min_confidence=None):
+    """Return the parsed sheet only if its confidence reaches the threshold, else None"""
+    if min_confidence is None:
+        min_confidence = ANSWER_SHEET_MIN_CONFIDENCE
+    data, confidence = parse_answer_sheet(text)
+    if data is None or confidence < min_confidence:
+        return None
+    return data
@@ -0,0 +1,208 @@
+# bench_exam_results.py
+"""
+Benchmark de /exam-results : ancienne requête (3 sous-requêtes corrélées par
+ligne + second passage pour les copies en attente) contre la requête en un
+passage de utils.get_exam_results_for_professor.
+
+Le jeu de données synthétique est créé dans une base SQLite temporaire, avec
+le schéma et les index de migrations.py :
+
+    python benchmarks/bench_exam_results.py
+    python benchmarks/bench_exam_results.py --students 1000 --questions 20 --graded 0.5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ======================================================
+# ANCIENNE IMPLÉMENTATION (référence)
+# ======================================================
+LEGACY_GRADED_QUERY = """
+    SELECT e.nom as student,
+           CAST((r.score * 100.0) / (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) AS INTEGER) as score,
+           MAX(s.date_soumission) as submission_date,
+           (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) as total_questions,
+           CASE
+               WHEN r.score >= (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) * 0.7 THEN 'PASSED'
+               ELSE 'NEEDS IMPROVEMENT'
+           END as status
+    FROM resultats r
+    JOIN eleves e ON r.eleve_id = e.id
+    JOIN exercices ex ON r.exercice_id = ex.id
+    JOIN professeurs p ON ex.professeur_id = p.id
+    JOIN soumissions s ON r.eleve_id = s.eleve_id AND r.exercice_id = s.exercice_id
+    WHERE p.id = :prof_id
+    AND r.exercice_id = :exam_id
+    GROUP BY e.id, r.id
+    ORDER BY MAX(s.date_soumission) DESC
+"""
+
+LEGACY_PENDING_QUERY = """
+    SELECT e.nom as student,
+           0 as score,
+           MAX(s.date_soumission) as submission_date,
+           'PENDING' as status
+    FROM soumissions s
+    JOIN eleves e ON s.eleve_id = e.id
+    LEFT JOIN resultats r ON r.eleve_id = s.eleve_id AND r.exercice_id = s.exercice_id
+    WHERE s.exercice_id = :exam_id AND r.id IS NULL
+    GROUP BY e.id
+    ORDER BY MAX(s.date_soumission) DESC
+"""
+
+
+def legacy_exam_results(db, exam_id, professor_id):
+    """Graded rows then pending rows, as two separate passes"""
+    from sqlalchemy import text
+    from utils import format_date
+
+    params = {"exam_id": exam_id, "prof_id": professor_id}
+    rows = db.execute(text(LEGACY_GRADED_QUERY), params).fetchall()
+    rows += db.execute(text(LEGACY_PENDING_QUERY), {"exam_id": exam_id}).fetchall()
+    return [
+        {
+            "student": row.student,
+            "score": row.score,
+            "submission_date": format_date(row.submission_date),
+            "status": row.status,
+        }
+        for row in rows
+    ]
+
+
+# ======================================================
+# JEU DE DONNÉES
+# ======================================================
+def build_dataset(db, students, questions, graded, other_exams, seed):
+    """
+    One professor, the benchmarked exam (students x questions answers) and
+    other_exams exercises answered by the same students, so that the
+    soumissions table is not limited to the exam being read.
+
+    Returns:
+        tuple: (professor_id, exam_id, number of soumissions rows)
+    """
+    from sqlalchemy import insert, text
+    from models import Eleve, Exercice, Professeur, Resultat, Soumission
+
+    rng = random.Random(seed)
+    professor = Professeur(nom="Bench", email="bench@example.com", mot_de_passe="x")
+    db.add(professor)
+    db.flush()
+
+    exercise_ids = db.scalars(
+        insert(Exercice).returning(Exercice.id, sort_by_parameter_order=True),
+        [
+            {"titre": f"Exercice {i}", "contenu": "", "professeur_id": professor.id}
+            for i in range(1 + other_exams)
+        ],
+    ).all()
+    exam_id = exercise_ids[0]
+
+    db.execute(insert(Eleve), [
+        {"id": i, "nom": f"Eleve {i:05d}", "email": f"eleve{i}@example.com"}
+        for i in range(1, students + 1)
+    ])
+
+    start = datetime(2026, 9, 1)
+    soumissions = []
+    resultats = []
+    for exercice_id in exercise_ids:
+        for eleve_id in range(1, students + 1):
+            date = start + timedelta(minutes=rng.randrange(60 * 24 * 30))
+            soumissions += [
+                {
+                    "eleve_id": eleve_id,
+                    "exercice_id": exercice_id,
+                    "date_soumission": date,
+                    "question": f"Q{q}",
+                    "answer": rng.choice("ABCD"),
+                }
+                for q in range(1, questions + 1)
+            ]
+            if rng.random() < graded:
+                resultats.append({
+                    "eleve_id": eleve_id,
+                    "exercice_id": exercice_id,
+                    "score": rng.randint(0, questions),
+                    "date_resultat": date,
+                })
+    db.execute(insert(Soumission), soumissions)
+    if resultats:
+        db.execute(insert(Resultat), resultats)
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return professor.id, exam_id, len(soumissions)
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--graded", type=float, default=0.8, help="Share of graded copies")
+    parser.add_argument("--other-exams", type=int, default=0, help="Other exercises answered by the same students")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_exam_results_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, BACKEND_DIR)
+
+    from database import Base, SessionLocal, engine
+    from migrations import run_migrations
+    from utils import get_exam_results_for_professor
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        professor_id, exam_id, rows = build_dataset(
+            db, args.students, args.questions, args.graded, args.other_exams, args.seed
+        )
+        print(f"Dataset: {rows} soumissions, {args.students} students, "
+              f"{args.questions} questions, {args.graded:.0%} graded")
+
+        legacy = legacy_exam_results(db, exam_id, professor_id)
+        current, _ = get_exam_results_for_professor(db, exam_id, professor_id)
+        key = lambda row: (row["student"], row["status"], row["score"], row["submission_date"])
+        if sorted(legacy, key=key) != sorted(current, key=key):
+            print("❌ Results differ between the legacy and the single-pass query")
+            sys.exit(1)
+        print(f"Same {len(current)} rows from both implementations")
+
+        results = {}
+        for name, func in (
+            ("legacy (graded + pending)", lambda: legacy_exam_results(db, exam_id, professor_id)),
+            ("single pass", lambda: get_exam_results_for_professor(db, exam_id, professor_id)),
+        ):
+            timings = time_call(func, args.repeat)
+            results[name] = statistics.median(timings)
+            print(f"{name:<28} median {results[name] * 1000:8.2f} ms   "
+                  f"min {min(timings) * 1000:8.2f} ms")
+
+        legacy_time, current_time = results.values()
+        print(f"Speedup: x{legacy_time / current_time:.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
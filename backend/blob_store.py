@@ -0,0 +1,113 @@
+# blob_store.py
+"""
+Stockage des copies PDF adressé par contenu.
+
+Chaque fichier est rangé sous le SHA-256 de ses octets, dans des
+sous-dossiers à deux niveaux (submissions/ab/cd/abcd....pdf) pour ne jamais
+avoir un seul répertoire géant. Une copie déjà reçue n'est pas réécrite.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+SUBMISSION_STORE_DIR = os.getenv("SUBMISSION_STORE_DIR", "submissions")
+# Compression gzip des PDF stockés (désactivée par défaut, les PDF sont déjà compressés)
+SUBMISSION_STORE_COMPRESS = os.getenv("SUBMISSION_STORE_COMPRESS", "0") == "1"
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_path(sha256: str, compressed: bool = False, root: str = None) -> str:
+    """Sharded path of a blob, e.g. submissions/ab/cd/abcd....pdf"""
+    root = root or SUBMISSION_STORE_DIR
+    suffix = ".pdf.gz" if compressed else ".pdf"
+    return os.path.join(root, sha256[:2], sha256[2:4], sha256 + suffix)
+
+
+def find_blob(sha256: str, root: str = None):
+    """Return (path, compressed) of a stored blob, or (None, False)"""
+    for compressed in (False, True):
+        path = blob_path(sha256, compressed, root)
+        if os.path.exists(path):
+            return path, compressed
+    return None, False
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put_blob(data: bytes, compress: bool = None, root: str = None):
+    """
+    Store bytes under their SHA-256, skipping the write if already present.
+
+    Returns:
+        tuple: (sha256, path, compressed, created)
+    """
+    sha256 = hash_bytes(data)
+    path, compressed = find_blob(sha256, root)
+    if path:
+        return sha256, path, compressed, False
+
+    compressed = SUBMISSION_STORE_COMPRESS if compress is None else compress
+    path = blob_path(sha256, compressed, root)
+    _atomic_write(path, gzip.compress(data) if compressed else data)
+    return sha256, path, compressed, True
+
+
+def read_blob(sha256: str, root: str = None) -> bytes:
+    """Return the original bytes of a stored blob, or None"""
+    path, compressed = find_blob(sha256, root)
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    return gzip.decompress(data) if compressed else data
+
+
+def put_file(file_path: str, sha256: str, compress: bool = None, root: str = None):
+    """
+    Move an already hashed temporary file into the store. The file is
+    consumed: it is either moved into place or deleted if the blob exists.
+
+    Returns:
+        tuple: (sha256, path, compressed, created)
+    """
+    path, compressed = find_blob(sha256, root)
+    if path:
+        os.remove(file_path)
+        return sha256, path, compressed, False
+
+    compressed = SUBMISSION_STORE_COMPRESS if compress is None else compress
+    path = blob_path(sha256, compressed, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not compressed:
+        os.replace(file_path, path)
+        return sha256, path, compressed, True
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with open(file_path, "rb") as src, os.fdopen(fd, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(file_path)
+    return sha256, path, compressed, True
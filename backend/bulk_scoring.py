@@ -0,0 +1,153 @@
+# bulk_scoring.py
+"""
+Notation automatique des QCM côté serveur.
+
+score_exercise_submissions confronte toutes les réponses d'un exercice (ou
+de quelques élèves) au corrigé de qcm_reponses et écrit le score de chaque
+élève dans resultats, en une seule instruction INSERT ... SELECT ... ON
+CONFLICT (exercice_id, eleve_id). Même règle que get_correct_answers_count :
+une réponse compte si sa lettre normalisée (code_reponse) est une lettre
+correcte de la question de même code normalisé.
+
+Le score calculé est aussi gardé dans resultats.score_auto. Un résultat
+n'est réécrit que si son score est encore le dernier score automatique : un
+score modifié à la main via /save-result/ (ou antérieur à score_auto) n'est
+jamais remplacé. Seules les lignes dont le score change sont réécrites
+(date_maj, donc la version des recommandations, ne bouge pas sinon).
+dashboard_rollups est ajusté dans la même transaction et le cache du tableau
+de bord invalidé après le commit.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, case, func, literal, select, text
+
+from dashboard_cache import dashboard_cache
+from dashboard_rollups import bump_rollups, month_key
+from database import dialect_insert
+from models import QCM, QCMReponse, Resultat, Soumission
+
+
+def _score_select(exercise_id, eleve_ids, now):
+    """One (exercice_id, eleve_id, score, score_auto, date_resultat, date_maj) row per student with answers"""
+    # Une réponse compte une fois, même si son code est en double dans le corrigé
+    score = func.count(func.distinct(case((QCMReponse.id.isnot(None), Soumission.id))))
+    query = (
+        select(
+            Soumission.exercice_id,
+            Soumission.eleve_id,
+            score,
+            score,
+            literal(now, DateTime),
+            literal(now, DateTime),
+        )
+        .select_from(Soumission)
+        .outerjoin(QCM, and_(
+            QCM.exercice_id == Soumission.exercice_id,
+            QCM.code_question == Soumission.code_question,
+        ))
+        .outerjoin(QCMReponse, and_(
+            QCMReponse.qcm_id == QCM.id,
+            QCMReponse.code_lettre == Soumission.code_reponse,
+            QCMReponse.est_correct.is_(True),
+        ))
+        # Le WHERE est aussi requis par SQLite pour un INSERT ... SELECT ... ON CONFLICT
+        .where(Soumission.exercice_id == exercise_id)
+        .group_by(Soumission.exercice_id, Soumission.eleve_id)
+    )
+    if eleve_ids is not None:
+        query = query.where(Soumission.eleve_id.in_(eleve_ids))
+    return query
+
+
+def score_exercise_submissions(db, exercise_id, eleve_ids=None):
+    """
+    Score the submissions of an exercise against its answer key and upsert
+    the results, then commit.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        exercise_id (int): Exercise to score
+        eleve_ids (list, optional): Only score these students, all by default
+
+    Returns:
+        dict: Number of results created, updated, left unchanged and kept
+              because they were edited by hand
+
+    Raises:
+        ValueError: If the exercise doesn't exist
+    """
+    exercise = db.execute(
+        text("SELECT professeur_id FROM exercices WHERE id = :exercise_id"),
+        {"exercise_id": exercise_id},
+    ).fetchone()
+    if exercise is None:
+        raise ValueError("Exercice not found")
+    if eleve_ids is not None:
+        eleve_ids = list(set(eleve_ids))
+        if not eleve_ids:
+            return {"created": 0, "updated": 0, "unchanged": 0, "manual": 0}
+
+    # Anciens scores, pour les deltas des rollups
+    previous_query = select(Resultat.eleve_id, Resultat.score, Resultat.score_auto).where(
+        Resultat.exercice_id == exercise_id
+    )
+    if eleve_ids is not None:
+        previous_query = previous_query.where(Resultat.eleve_id.in_(eleve_ids))
+    previous_rows = db.execute(previous_query).fetchall()
+    previous = {row.eleve_id: row.score for row in previous_rows}
+
+    students_query = select(Soumission.eleve_id.distinct()).where(Soumission.exercice_id == exercise_id)
+    if eleve_ids is not None:
+        students_query = students_query.where(Soumission.eleve_id.in_(eleve_ids))
+    students = set(db.execute(students_query).scalars())
+    manual = sum(
+        1 for row in previous_rows
+        if row.eleve_id in students and (row.score_auto is None or row.score != row.score_auto)
+    )
+
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, Resultat).from_select(
+        ["exercice_id", "eleve_id", "score", "score_auto", "date_resultat", "date_maj"],
+        _score_select(exercise_id, eleve_ids, now),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["exercice_id", "eleve_id"],
+        set_={
+            "score": stmt.excluded.score,
+            "score_auto": stmt.excluded.score_auto,
+            "date_maj": stmt.excluded.date_maj,
+        },
+        # Score encore automatique, et qui change
+        where=and_(
+            Resultat.score_auto.isnot(None),
+            Resultat.score == Resultat.score_auto,
+            Resultat.score != stmt.excluded.score,
+        ),
+    )
+    # Lignes insérées ou réellement mises à jour ; date_resultat reste celle de la création
+    written = db.execute(
+        stmt.returning(Resultat.eleve_id, Resultat.score, Resultat.date_resultat)
+    ).fetchall()
+
+    deltas = defaultdict(lambda: (0, 0, 0))
+    created = 0
+    for row in written:
+        key = (exercise.professeur_id, month_key(row.date_resultat))
+        score, results, copies = deltas[key]
+        if row.eleve_id in previous:
+            deltas[key] = (score + row.score - (previous[row.eleve_id] or 0), results, copies)
+        else:
+            created += 1
+            deltas[key] = (score + row.score, results + 1, copies)
+    bump_rollups(db, deltas)
+    db.commit()
+    if written:
+        dashboard_cache.invalidate(exercise.professeur_id, "results")
+
+    return {
+        "created": created,
+        "updated": len(written) - created,
+        "unchanged": len(students) - len(written) - manual,
+        "manual": manual,
+    }
@@ -0,0 +1,285 @@
+# dashboard_cache.py
+"""
+Cache des lectures du tableau de bord, par professeur et par endpoint.
+
+Chaque endpoint déclare les données dont il dépend (ENDPOINT_SCOPES). Les
+écritures incrémentent la version de ces données pour le professeur
+concerné : une entrée n'est servie que si les versions enregistrées avec
+elle sont toujours les versions courantes.
+
+- submissions : insert_submission_data, insert_submissions_batch
+- results     : save_student_result
+- exercises   : insert_qcm_exercises (insert_qcm_data, /chat/, /exercises/bulk)
+
+Backends : "memory" (par processus) ou "redis" (partagé entre workers, le
+paquet redis doit être installé). En mémoire avec plusieurs workers, une
+écriture n'invalide que le cache du worker qui l'a reçue : la durée de vie
+DASHBOARD_CACHE_TTL_SECONDS borne alors l'ancienneté des réponses.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import text
+
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "1") == "1"
+DASHBOARD_CACHE_BACKEND = os.getenv("DASHBOARD_CACHE_BACKEND", "memory")
+DASHBOARD_CACHE_REDIS_URL = os.getenv("DASHBOARD_CACHE_REDIS_URL", "redis://localhost:6379/0")
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "2000"))
+# Filet de sécurité pour les écritures qui ne passent pas par les hooks, 0 = pas d'expiration
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+
+# Données lues par chaque endpoint mis en cache
+ENDPOINT_SCOPES = {
+    "metrics": ("results", "submissions"),
+    "students": ("submissions",),
+    "exercises": ("exercises",),
+    "exams": ("exercises",),
+    "exam-results": ("results", "submissions"),
+}
+
+
+# ======================================================
+# BACKENDS
+# ======================================================
+class MemoryDashboardBackend:
+    """LRU in-process backend"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl_seconds):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def get_versions(self, version_keys):
+        with self._lock:
+            return [self._versions.get(key, 0) for key in version_keys]
+
+    def bump_versions(self, version_keys):
+        with self._lock:
+            for key in version_keys:
+                self._versions[key] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def count(self):
+        return len(self._entries)
+
+
+class RedisDashboardBackend:
+    """Backend shared by every worker, entries expire with the Redis TTL"""
+
+    PREFIX = "dashboard:"
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.PREFIX + "entry:" + key)
+        if raw is None:
+            return None
+        payload, versions, created_at = json.loads(raw)
+        return payload, tuple(versions), created_at
+
+    def set(self, key, entry, ttl_seconds):
+        self._client.set(
+            self.PREFIX + "entry:" + key, json.dumps(entry), ex=ttl_seconds or None
+        )
+        return 0
+
+    def get_versions(self, version_keys):
+        values = self._client.mget([self.PREFIX + "version:" + key for key in version_keys])
+        return [int(value or 0) for value in values]
+
+    def bump_versions(self, version_keys):
+        pipe = self._client.pipeline()
+        for key in version_keys:
+            pipe.incr(self.PREFIX + "version:" + key)
+        pipe.execute()
+
+    def clear(self):
+        keys = list(self._client.scan_iter(self.PREFIX + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def count(self):
+        return sum(1 for _ in self._client.scan_iter(self.PREFIX + "entry:*"))
+
+
+# ======================================================
+# CACHE
+# ======================================================
+class DashboardCache:
+    def __init__(self, backend, ttl_seconds=0, enabled=True):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        # Entrées trouvées mais périmées par une écriture ou par la durée de vie
+        self.stale = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.errors = 0
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+        self._by_endpoint = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version_keys(professeur_id, scopes):
+        return [f"{professeur_id}:{scope}" for scope in scopes]
+
+    @staticmethod
+    def make_key(professeur_id, endpoint, params=None):
+        suffix = json.dumps(params, sort_keys=True, default=str) if params else ""
+        return f"{professeur_id}:{endpoint}:{suffix}"
+
+    def _record(self, endpoint, hit, age=None):
+        with self._lock:
+            counter = "hits" if hit else "misses"
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._by_endpoint[endpoint][counter] += 1
+            if age is not None:
+                self._hit_age_total += age
+                self._hit_age_max = max(self._hit_age_max, age)
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get_or_compute(self, professeur_id, endpoint, compute, params=None):
+        """
+        Serve an endpoint response from the cache, or compute and store it.
+
+        Args:
+            professeur_id (int): Professor the response belongs to
+            endpoint (str): Key of ENDPOINT_SCOPES
+            compute (callable): Builds the response on a miss, may raise HTTPException
+            params (dict, optional): Request parameters that change the response
+
+        Returns:
+            The cached or freshly computed response
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(professeur_id, endpoint, params)
+        version_keys = self._version_keys(professeur_id, ENDPOINT_SCOPES[endpoint])
+        try:
+            versions = tuple(self.backend.get_versions(version_keys))
+            entry = self.backend.get(key)
+        except Exception as e:
+            # Un backend partagé indisponible ne doit pas casser le tableau de bord
+            print(f"Dashboard cache unavailable: {e}")
+            self._count("errors")
+            return compute()
+
+        if entry is not None:
+            payload, entry_versions, created_at = entry
+            age = time.time() - created_at
+            if tuple(entry_versions) != versions:
+                self._count("stale")
+            elif self.ttl_seconds and age > self.ttl_seconds:
+                self._count("expired")
+            else:
+                self._record(endpoint, True, age)
+                return payload
+
+        self._record(endpoint, False)
+        payload = compute()
+        try:
+            evicted = self.backend.set(key, (payload, versions, time.time()), self.ttl_seconds)
+            self._count("evictions", evicted)
+        except Exception as e:
+            print(f"Dashboard cache unavailable: {e}")
+            self._count("errors")
+        return payload
+
+    def invalidate(self, professeur_id, *scopes):
+        """Mark the given data of a professor as changed, to call after commit"""
+        if not self.enabled or professeur_id is None:
+            return
+        try:
+            self.backend.bump_versions(self._version_keys(professeur_id, scopes))
+            self._count("invalidations")
+        except Exception as e:
+            print(f"Dashboard cache invalidation failed: {e}")
+            self._count("errors")
+
+    def invalidate_exercises(self, db, exercise_ids, *scopes):
+        """Invalidate the professors owning the given exercises"""
+        exercise_ids = set(exercise_ids)
+        if not self.enabled or not exercise_ids:
+            return
+        params = {f"ex{i}": exercise_id for i, exercise_id in enumerate(exercise_ids)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        professors = db.execute(text(f"""
+            SELECT DISTINCT professeur_id FROM exercices WHERE id IN ({placeholders})
+        """), params).scalars().all()
+        for professeur_id in professors:
+            self.invalidate(professeur_id, *scopes)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.count(),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stale": self.stale,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            # Ancienneté des réponses servies depuis le cache
+            "avg_hit_age_seconds": round(self._hit_age_total / self.hits, 3) if self.hits else 0.0,
+            "max_hit_age_seconds": round(self._hit_age_max, 3),
+            "endpoints": {endpoint: dict(counts) for endpoint, counts in self._by_endpoint.items()},
+        }
+
+
+def create_dashboard_cache():
+    if DASHBOARD_CACHE_BACKEND == "redis":
+        backend = RedisDashboardBackend(DASHBOARD_CACHE_REDIS_URL)
+    else:
+        backend = MemoryDashboardBackend(DASHBOARD_CACHE_MAX_ENTRIES)
+    return DashboardCache(
+        backend,
+        ttl_seconds=DASHBOARD_CACHE_TTL_SECONDS,
+        enabled=DASHBOARD_CACHE_ENABLED,
+    )
+
+
+dashboard_cache = create_dashboard_cache()
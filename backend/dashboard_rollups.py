@@ -0,0 +1,180 @@
+# dashboard_rollups.py
+"""
+Agrégats mensuels par professeur pour le tableau de bord (/metrics).
+
+Chaque ligne de dashboard_rollups cumule, pour un professeur et un mois :
+- score_sum / result_count : les résultats enregistrés ce mois-là
+- copies_count : les copies (couple élève/exercice) reçues ce mois-là, mois
+  de leur première soumission (copies.date_premiere_soumission)
+
+Les compteurs sont mis à jour dans la transaction des écritures
+(save_student_result, score_exercise_submissions, upsert_submission_rows),
+get_metrics ne lit donc que quelques lignes indexées. Pour tout recalculer :
+
+    python dashboard_rollups.py --rebuild
+"""
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import dialect_insert
+from models import Copie, DashboardRollup
+
+NO_PROFESSOR = 0
+
+
+def month_key(value):
+    """YYYY-MM of a datetime, or of a date string as returned by SQLite"""
+    if value is None:
+        value = datetime.utcnow()
+    if isinstance(value, str):
+        return value[:7]
+    return value.strftime("%Y-%m")
+
+
+def bump_rollups(db, deltas):
+    """
+    Add deltas to the rollups, without committing.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        deltas (dict): {(professeur_id, mois): (score_delta, result_delta, copies_delta)}
+    """
+    rows = [
+        {
+            "professeur_id": professeur_id if professeur_id is not None else NO_PROFESSOR,
+            "mois": mois,
+            "score_sum": score,
+            "result_count": results,
+            "copies_count": copies,
+        }
+        for (professeur_id, mois), (score, results, copies) in deltas.items()
+        if score or results or copies
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db, DashboardRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["professeur_id", "mois"],
+        set_={
+            "score_sum": DashboardRollup.score_sum + stmt.excluded.score_sum,
+            "result_count": DashboardRollup.result_count + stmt.excluded.result_count,
+            "copies_count": DashboardRollup.copies_count + stmt.excluded.copies_count,
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def record_result_change(db, professeur_id, date_resultat, score_delta, result_delta):
+    """Account for a created (result_delta=1) or re-scored (0) result"""
+    bump_rollups(db, {
+        (professeur_id, month_key(date_resultat)): (score_delta, result_delta, 0),
+    })
+
+
+def record_new_copies(db, soumission_rows):
+    """
+    Register the student/exercise pairs of soumission_rows in copies and
+    count the ones that were not there yet, without committing.
+
+    The INSERT ... ON CONFLICT DO NOTHING decides which copies are new, so
+    two concurrent submissions of the same pair count it once.
+    """
+    pairs = {}
+    for row in soumission_rows:
+        pairs.setdefault((row["eleve_id"], row["exercice_id"]), row["date_soumission"])
+    if not pairs:
+        return
+    stmt = dialect_insert(db, Copie).on_conflict_do_nothing(
+        index_elements=["eleve_id", "exercice_id"]
+    )
+    new_copies = db.execute(
+        stmt.returning(Copie.exercice_id, Copie.date_premiere_soumission),
+        [
+            {"eleve_id": eleve_id, "exercice_id": exercice_id, "date_premiere_soumission": date_soumission}
+            for (eleve_id, exercice_id), date_soumission in pairs.items()
+        ],
+    ).fetchall()
+    if not new_copies:
+        return
+
+    exercise_params = {f"ex{i}": value for i, value in enumerate({row.exercice_id for row in new_copies})}
+    exercises = ", ".join(f":{name}" for name in exercise_params)
+    professors = dict(db.execute(text(f"""
+        SELECT id, professeur_id FROM exercices WHERE id IN ({exercises})
+    """), exercise_params).fetchall())
+
+    deltas = defaultdict(lambda: (0, 0, 0))
+    for row in new_copies:
+        key = (professors.get(row.exercice_id), month_key(row.date_premiere_soumission))
+        score, results, copies = deltas[key]
+        deltas[key] = (score, results, copies + 1)
+    bump_rollups(db, deltas)
+
+
+def get_rollup_totals(db, professeur_id, current_month):
+    """
+    Totals of all months and of the months before current_month.
+
+    Returns:
+        Row: score_sum, result_count, prev_score_sum, prev_count, copies_this_month
+    """
+    where = "WHERE professeur_id = :prof_id" if professeur_id else ""
+    return db.execute(text(f"""
+        SELECT COALESCE(SUM(score_sum), 0) AS score_sum,
+               COALESCE(SUM(result_count), 0) AS result_count,
+               COALESCE(SUM(CASE WHEN mois < :current_month THEN score_sum ELSE 0 END), 0) AS prev_score_sum,
+               COALESCE(SUM(CASE WHEN mois < :current_month THEN result_count ELSE 0 END), 0) AS prev_count,
+               COALESCE(SUM(CASE WHEN mois = :current_month THEN copies_count ELSE 0 END), 0) AS copies_this_month
+        FROM dashboard_rollups
+        {where}
+    """), {"prof_id": professeur_id, "current_month": current_month}).fetchone()
+
+
+def rebuild_dashboard_rollups(db):
+    """
+    Recompute every rollup from resultats and copies, then commit.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+
+    results = db.execute(text("""
+        SELECT ex.professeur_id, r.date_resultat, r.score
+        FROM resultats r
+        LEFT JOIN exercices ex ON r.exercice_id = ex.id
+    """)).fetchall()
+    for row in results:
+        bucket = deltas[(row.professeur_id, month_key(row.date_resultat))]
+        bucket[0] += row.score or 0
+        bucket[1] += 1
+
+    copies = db.execute(text("""
+        SELECT ex.professeur_id, c.date_premiere_soumission
+        FROM copies c
+        LEFT JOIN exercices ex ON c.exercice_id = ex.id
+    """)).fetchall()
+    for row in copies:
+        deltas[(row.professeur_id, month_key(row.date_premiere_soumission))][2] += 1
+
+    db.execute(text("DELETE FROM dashboard_rollups"))
+    bump_rollups(db, {key: tuple(values) for key, values in deltas.items()})
+    db.commit()
+    return len(deltas)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    if "--rebuild" not in sys.argv:
+        print("Usage: python dashboard_rollups.py --rebuild")
+        sys.exit(1)
+    db = SessionLocal()
+    try:
+        count = rebuild_dashboard_rollups(db)
+        print(f"✅ Rebuilt {count} dashboard rollup row(s)")
+    finally:
+        db.close()
@@ -0,0 +1,395 @@
+# grading_jobs.py
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from database import SessionLocal
+from llm_agent import analyze_student_copy
+from models import GradingJob
+from blob_store import put_file
+from bulk_scoring import score_exercise_submissions
+from utils import (
+    extract_text_from_pdf_file,
+    extract_text_from_stored_copy,
+    get_submission_blobs,
+    insert_submission_data,
+    insert_submissions_batch,
+    load_submission_text,
+    record_submission_blob,
+    get_correct_answers_count,
+    get_submission_data,
+    get_correct_answers,
+)
+
+# Nombre de copies corrigées en parallèle (chaque copie = un appel LLM)
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", "4"))
+
+# Appels LLM simultanés lors d'une correction par lot
+GRADING_LLM_CONCURRENCY = int(os.getenv("GRADING_LLM_CONCURRENCY", "10"))
+
+# Processus dédiés à l'extraction du texte des PDF (CPU)
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", str(os.cpu_count() or 2)))
+
+# Un job "running" sans nouvelle étape depuis ce délai est considéré abandonné
+# (processus arrêté) et peut être repris par un autre processus
+GRADING_JOB_STALE_SECONDS = int(os.getenv("GRADING_JOB_STALE_SECONDS", "900"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_executor = ThreadPoolExecutor(
+    max_workers=GRADING_WORKERS, thread_name_prefix="grading"
+)
+
+
+# ======================================================
+# PIPELINE DE CORRECTION
+# ======================================================
+def grade_structured_copy(structured_data, db, copie_sha256=None):
+    """
+    Insert an analysed copy and compute its score.
+
+    Args:
+        structured_data (dict): Output of the copy analysis agent
+        db (Session): SQLAlchemy database session
+        copie_sha256 (str, optional): Hash of the stored PDF copy
+
+    Returns:
+        dict: Same payload as the historical /correct-exam/ response,
+              or None if the submission could not be inserted
+    """
+    if not insert_submission_data(structured_data, db, copie_sha256):
+        return None
+    _auto_score(db, [structured_data])
+    return _score_copy(structured_data, db)
+
+
+def _auto_score(db, submissions):
+    """
+    Write the results of freshly inserted copies, one bulk scoring statement
+    per exercise. A failure leaves the submissions in place.
+    """
+    students_by_exercise = {}
+    for data in submissions:
+        students_by_exercise.setdefault(data.get("id_exercice"), []).append(data.get("id_eleve"))
+    for exercise_id, eleve_ids in students_by_exercise.items():
+        try:
+            score_exercise_submissions(db, exercise_id, eleve_ids)
+        except Exception as e:
+            print(f"Automatic scoring failed for exercise {exercise_id}: {e}")
+            db.rollback()
+
+
+def _score_copy(structured_data, db):
+    id_eleve = structured_data.get("id_eleve")
+    id_exercice = structured_data.get("id_exercice")
+    return {
+        "message": "Submission processed successfully",
+        "data": structured_data,
+        "correct_count": get_correct_answers_count(
+            db, id_eleve=id_eleve, id_exercice=id_exercice
+        ),
+        "submission_data": get_submission_data(db, id_eleve, id_exercice),
+        "correct_answers": get_correct_answers(db, id_exercice),
+    }
+
+
+def _set_stage(db, job, stage, progress, status=JOB_RUNNING):
+    job.status = status
+    job.stage = stage
+    job.progress = progress
+    job.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def claim_grading_job(db, job_id):
+    """
+    Atomically move a queued job to running. Several processes may hold the
+    same job id (startup resume of every uvicorn worker): only the one whose
+    UPDATE matched runs it.
+
+    Returns:
+        bool: True if this process now owns the job
+    """
+    claimed = db.execute(
+        update(GradingJob)
+        .where(GradingJob.id == job_id, GradingJob.status == JOB_QUEUED)
+        .values(status=JOB_RUNNING, stage="claimed", updated_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def run_grading_job(job_id):
+    """
+    Run extract -> LLM -> insert -> score for one job. Executed in the worker
+    pool with its own database session.
+    """
+    db = SessionLocal()
+    try:
+        if not claim_grading_job(db, job_id):
+            return
+        job = db.get(GradingJob, job_id)
+
+        _set_stage(db, job, "extracting", 10)
+        if job.copie_sha256:
+            text = load_submission_text(db, job.copie_sha256)
+        else:
+            text = extract_text_from_pdf_file(job.file_path)
+        if not text:
+            raise ValueError("Impossible d'extraire le texte du PDF")
+
+        _set_stage(db, job, "analyzing", 30)
+        structured_data = analyze_student_copy(text)
+
+        _set_stage(db, job, "inserting", 70)
+        payload = grade_structured_copy(structured_data, db, job.copie_sha256)
+        if payload is None:
+            raise ValueError("Submission failed")
+
+        job.result = json.dumps(payload, default=str)
+        _set_stage(db, job, JOB_DONE, 100, status=JOB_DONE)
+    except Exception as e:
+        print(f"Grading job {job_id} failed: {e}")
+        db.rollback()
+        job = db.get(GradingJob, job_id)
+        if job:
+            job.error = str(e)
+            _set_stage(db, job, JOB_FAILED, job.progress or 0, status=JOB_FAILED)
+    finally:
+        db.close()
+
+
+# ======================================================
+# FILE D'ATTENTE
+# ======================================================
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def create_grading_job(db, job_id, professeur_id, filename, file_path, copie_sha256=None):
+    """Persist a queued job and hand it to the worker pool"""
+    job = GradingJob(
+        id=job_id,
+        professeur_id=professeur_id,
+        status=JOB_QUEUED,
+        stage=JOB_QUEUED,
+        progress=0,
+        filename=filename,
+        file_path=file_path,
+        copie_sha256=copie_sha256,
+    )
+    db.add(job)
+    db.commit()
+    _executor.submit(run_grading_job, job_id)
+    return job
+
+
+def resume_pending_jobs():
+    """
+    Hand the queued jobs to the worker pool, after re-queuing the running
+    jobs whose process stopped (no progress for GRADING_JOB_STALE_SECONDS).
+    Each job is claimed before it runs, so a job resumed by several
+    processes still runs once.
+    """
+    db = SessionLocal()
+    try:
+        stale_before = datetime.utcnow() - timedelta(seconds=GRADING_JOB_STALE_SECONDS)
+        db.execute(
+            update(GradingJob)
+            .where(
+                GradingJob.status == JOB_RUNNING,
+                or_(GradingJob.updated_at.is_(None), GradingJob.updated_at < stale_before),
+            )
+            .values(status=JOB_QUEUED, stage=JOB_QUEUED, updated_at=datetime.utcnow())
+        )
+        db.commit()
+        job_ids = [
+            job_id for (job_id,) in
+            db.query(GradingJob.id)
+            .filter(GradingJob.status == JOB_QUEUED)
+            .order_by(GradingJob.created_at)
+            .all()
+        ]
+        for job_id in job_ids:
+            _executor.submit(run_grading_job, job_id)
+        return len(job_ids)
+    finally:
+        db.close()
+
+
+def get_grading_job(db, job_id, professeur_id):
+    """Return the status of a job owned by the professor, or None"""
+    job = (
+        db.query(GradingJob)
+        .filter(GradingJob.id == job_id, GradingJob.professeur_id == professeur_id)
+        .first()
+    )
+    if not job:
+        return None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "filename": job.filename,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+    }
+
+
+# ======================================================
+# CORRECTION PAR LOT
+# ======================================================
+_process_pool = None
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn : le serveur a déjà des threads, fork n'est pas sûr
+        _process_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def _reset_process_pool(broken_pool):
+    """Drop a pool whose worker died (MuPDF crash, OOM), the next batch gets a new one"""
+    global _process_pool
+    if _process_pool is broken_pool:
+        _process_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_stored_texts(hashes):
+    """
+    Extract the text of stored copies in the process pool, one task per copy.
+
+    Returns:
+        tuple: ({sha256: text}, {sha256: error message}) for the copies that failed
+    """
+    texts, errors = {}, {}
+    if not hashes:
+        return texts, errors
+    pool = _get_process_pool()
+    futures = {}
+    try:
+        for sha256 in hashes:
+            futures[sha256] = pool.submit(extract_text_from_stored_copy, sha256)
+    except BrokenProcessPool:
+        pass
+    broken = False
+    for sha256 in hashes:
+        future = futures.get(sha256)
+        try:
+            if future is None:
+                raise BrokenProcessPool("extraction pool is broken")
+            texts[sha256] = future.result()
+        except BrokenProcessPool as e:
+            broken = True
+            errors[sha256] = f"Text extraction worker crashed: {e}"
+        except Exception as e:
+            errors[sha256] = f"Text extraction failed: {e}"
+    if broken:
+        print("Text extraction pool broken, it will be recreated")
+        _reset_process_pool(pool)
+    return texts, errors
+
+
+def grade_copies_batch(copies, db):
+    """
+    Grade a whole class set.
+
+    Copies are moved into the submission store, text is extracted from the
+    stored files in a process pool (copies already in the store reuse their
+    stored text), copies that the local answer-sheet parser cannot read go to
+    the analysis agent with at most GRADING_LLM_CONCURRENCY calls in flight,
+    and every submission is written in one transaction.
+
+    Args:
+        copies (list): SpooledUpload of each PDF copy
+        db (Session): SQLAlchemy database session
+
+    Returns:
+        list: One outcome dict per copy, in upload order
+    """
+    if not copies:
+        return []
+
+    outcomes = [{"filename": copy.filename, "status": JOB_FAILED} for copy in copies]
+    hashes = [copy.sha256 for copy in copies]
+
+    # 1. Stockage puis extraction du texte (CPU) en parallèle, sauf pour les
+    #    copies déjà reçues. Une copie qui échoue ici échoue seule.
+    known = get_submission_blobs(db, hashes)
+    texts_by_hash = {
+        sha256: blob.texte_extrait for sha256, blob in known.items() if blob.texte_extrait
+    }
+    stored = {}
+    for index, copy in enumerate(copies):
+        try:
+            sha256, file_path, compressed, _ = put_file(copy.path, copy.sha256)
+        except Exception as e:
+            print(f"Failed to store copy {copy.filename}: {e}")
+            outcomes[index]["error"] = "Failed to save submission file"
+            continue
+        stored[sha256] = (file_path, copy.size, compressed)
+
+    extracted, extraction_errors = _extract_stored_texts(
+        [sha256 for sha256 in stored if sha256 not in texts_by_hash]
+    )
+    texts_by_hash.update(extracted)
+    for sha256, (file_path, size, compressed) in stored.items():
+        record_submission_blob(
+            db, sha256, file_path, size, compressed, texts_by_hash.get(sha256)
+        )
+    texts = [texts_by_hash.get(sha256, "") for sha256 in hashes]
+
+    # 2. Lecture locale, sinon analyse LLM avec une concurrence bornée
+    def analyze(index):
+        if outcomes[index].get("error"):
+            return None
+        if not texts[index]:
+            outcomes[index]["error"] = extraction_errors.get(
+                hashes[index], "Impossible d'extraire le texte du PDF"
+            )
+            return None
+        try:
+            return analyze_student_copy(texts[index])
+        except Exception as e:
+            outcomes[index]["error"] = str(e)
+            return None
+
+    workers = max(1, min(GRADING_LLM_CONCURRENCY, len(copies)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grading-llm") as pool:
+        structured = list(pool.map(analyze, range(len(copies))))
+
+    # 3. Insertion de toutes les soumissions dans une seule transaction
+    analysed = [i for i, data in enumerate(structured) if data]
+    inserted = insert_submissions_batch(
+        [structured[i] for i in analysed], db, [hashes[i] for i in analysed]
+    )
+
+    # 4. Résultats de toutes les copies insérées, puis détail par copie
+    _auto_score(db, [structured[i] for i, ok in zip(analysed, inserted) if ok])
+    for index, ok in zip(analysed, inserted):
+        if not ok:
+            outcomes[index]["error"] = "Submission failed"
+            outcomes[index]["data"] = structured[index]
+            continue
+        outcomes[index].update(_score_copy(structured[index], db))
+        outcomes[index]["status"] = JOB_DONE
+
+    return outcomes
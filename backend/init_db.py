@@ -1,11 +1,14 @@
 from database import engine, Base
 # Import all models so SQLAlchemy knows about them
 import models
+from migrations import run_migrations
 
 
 def init_db():
     # Creates all tables defined in models that inherit from Base
     Base.metadata.create_all(bind=engine)
+    # Brings existing databases up to date and records the schema version
+    run_migrations(engine)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+# item_analysis.py
+"""
+Analyse des items d'un exercice QCM (psychométrie classique).
+
+Les réponses de l'exercice sont chargées en une requête dans une matrice
+NumPy élèves x questions (indice de la lettre choisie), confrontée au corrigé
+compilé de l'exercice (answer_key). Toutes les statistiques sont ensuite vectorisées :
+
+- difficulté : proportion de bonnes réponses à la question
+- discrimination : écart de réussite entre les 27 % meilleurs et les 27 %
+  moins bons élèves (indice D), et corrélation point-bisériale avec le score
+  sur les autres questions
+- distracteurs : répartition des lettres choisies, réponses vides ou hors choix
+- fiabilité de l'exercice : KR-20
+"""
+import numpy as np
+from sqlalchemy import text
+
+from answer_key import answer_key_cache
+
+DEFAULT_LETTERS = ("A", "B", "C", "D")
+# Valeurs de la matrice hors lettres proposées
+BLANK = -1
+OTHER = -2
+# Part des élèves dans les groupes haut et bas de l'indice D
+GROUP_SHARE = 0.27
+
+
+def _index_in(values, vocabulary):
+    """Position of each value in vocabulary (both str arrays), -1 when absent"""
+    if not len(vocabulary) or not len(values):
+        return np.full(len(values), -1, dtype=np.int16)
+    order = np.argsort(vocabulary)
+    ordered = vocabulary[order]
+    positions = np.minimum(np.searchsorted(ordered, values), len(ordered) - 1)
+    return np.where(ordered[positions] == values, order[positions], -1).astype(np.int16)
+
+
+def load_response_matrix(db, exercise_id):
+    """
+    Load the answers of an exercise as a student x question matrix.
+
+    Returns:
+        dict: question codes, option letters, key (questions x letters
+              boolean table of the correct answers), student ids and the
+              choices matrix (option index, BLANK or OTHER)
+    """
+    answer_key = answer_key_cache.get(db, exercise_id)
+    entries = list(answer_key.entries.items())
+
+    questions = [str(entry.id_qcm or "").strip() for _, entry in entries]
+    letters = sorted(set(DEFAULT_LETTERS) | {
+        letter for _, entry in entries for letter in entry.options if letter
+    })
+    letter_index = {letter: i for i, letter in enumerate(letters)}
+
+    # Toutes les lettres correctes d'une question comptent, comme dans AnswerKey
+    key = np.zeros((len(questions), len(letters)), dtype=bool)
+    for q, (_, entry) in enumerate(entries):
+        key[q, [letter_index[letter] for letter in entry.letters if letter]] = True
+
+    # Codes et lettres normalisés à l'écriture
+    answer_rows = db.execute(text("""
+        SELECT eleve_id, COALESCE(code_question, '') AS code_question,
+               COALESCE(code_reponse, '') AS code_reponse
+        FROM soumissions
+        WHERE exercice_id = :exercise_id
+    """), {"exercise_id": exercise_id}).fetchall()
+
+    eleve_col, question_col, answer_col = zip(*answer_rows) if answer_rows else ((), (), ())
+    students, student_rows = np.unique(np.array(eleve_col, dtype=np.int64), return_inverse=True)
+    question_cols = _index_in(
+        np.array(question_col, dtype=str), np.array([code or "" for code, _ in entries], dtype=str)
+    )
+    answers = np.array(answer_col, dtype=str)
+    choices_flat = _index_in(answers, np.array(letters, dtype=str))
+    choices_flat[choices_flat < 0] = OTHER
+    choices_flat[answers == ""] = BLANK
+
+    choices = np.full((len(students), len(questions)), BLANK, dtype=np.int16)
+    # Réponses à des questions absentes du corrigé : ignorées
+    known = question_cols >= 0
+    choices[student_rows[known], question_cols[known]] = choices_flat[known]
+
+    return {
+        "questions": questions,
+        "letters": letters,
+        "key": key,
+        "students": students,
+        "choices": choices,
+    }
+
+
+def _round(value, digits=3):
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def compute_item_statistics(choices, key, letters):
+    """
+    Vectorized item statistics of a choices matrix.
+
+    Args:
+        choices (ndarray): students x questions option indices (BLANK / OTHER otherwise)
+        key (ndarray): questions x letters boolean table of the correct answers
+        letters (list): Option letters, by index
+
+    Returns:
+        dict: Per-question arrays and exercise-level statistics
+    """
+    n_students, n_questions = choices.shape
+    # Deux colonnes fausses en fin de table : BLANK (-1) et OTHER (-2) y pointent
+    key_table = np.concatenate([key, np.zeros((n_questions, 2), dtype=bool)], axis=1)
+    correct = key_table[np.arange(n_questions)[np.newaxis, :], choices]
+    correct = correct.astype(np.float64)
+    totals = correct.sum(axis=1)
+
+    difficulty = correct.mean(axis=0) if n_students else np.full(n_questions, np.nan)
+
+    # Indice D : groupes haut / bas sur le score total
+    group_size = max(1, int(round(n_students * GROUP_SHARE))) if n_students >= 2 else 0
+    if group_size:
+        order = np.argsort(totals, kind="stable")
+        lower = correct[order[:group_size]].mean(axis=0)
+        upper = correct[order[-group_size:]].mean(axis=0)
+        discrimination = upper - lower
+    else:
+        discrimination = np.full(n_questions, np.nan)
+
+    # Point-bisériale corrigée : corrélation item / score sur les autres items
+    rest = totals[:, np.newaxis] - correct
+    item_centered = correct - correct.mean(axis=0) if n_students else correct
+    rest_centered = rest - rest.mean(axis=0) if n_students else rest
+    denominator = np.sqrt((item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point_biserial = (item_centered * rest_centered).sum(axis=0) / denominator
+
+    # Répartition des choix : lettres, vides, hors choix
+    options = np.arange(len(letters))[:, np.newaxis, np.newaxis]
+    option_counts = (choices[np.newaxis, :, :] == options).sum(axis=1)
+    blank_counts = (choices == BLANK).sum(axis=0)
+    other_counts = (choices == OTHER).sum(axis=0)
+
+    # KR-20, variance des scores totaux sur la population
+    variance = totals.var() if n_students else 0.0
+    if n_questions >= 2 and variance > 0:
+        pq = (difficulty * (1 - difficulty)).sum()
+        kr20 = (n_questions / (n_questions - 1)) * (1 - pq / variance)
+    else:
+        kr20 = np.nan
+
+    return {
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "point_biserial": point_biserial,
+        "option_counts": option_counts,
+        "blank_counts": blank_counts,
+        "other_counts": other_counts,
+        "totals": totals,
+        "kr20": kr20,
+    }
+
+
+def get_item_analysis(db, exercise_id):
+    """
+    Item analysis report of an exercise, ready to be returned as JSON.
+
+    Returns:
+        dict: Exercise-level statistics and one entry per question
+    """
+    matrix = load_response_matrix(db, exercise_id)
+    choices, key, letters = matrix["choices"], matrix["key"], matrix["letters"]
+    stats = compute_item_statistics(choices, key, letters)
+    n_students = choices.shape[0]
+
+    items = []
+    for q, code in enumerate(matrix["questions"]):
+        distractors = {
+            letter: {
+                "count": int(stats["option_counts"][i, q]),
+                "share": _round(stats["option_counts"][i, q] / n_students) if n_students else None,
+                "is_correct": bool(key[q, i]),
+            }
+            for i, letter in enumerate(letters)
+        }
+        items.append({
+            "question": code,
+            "correct_answers": [letter for i, letter in enumerate(letters) if key[q, i]],
+            "difficulty": _round(stats["difficulty"][q]),
+            "discrimination": _round(stats["discrimination"][q]),
+            "point_biserial": _round(stats["point_biserial"][q]),
+            "answered": int(n_students - stats["blank_counts"][q]),
+            "blank": int(stats["blank_counts"][q]),
+            "other": int(stats["other_counts"][q]),
+            "distractors": distractors,
+        })
+
+    totals = stats["totals"]
+    return {
+        "exercise_id": exercise_id,
+        "students": n_students,
+        "questions": len(items),
+        "mean_score": _round(totals.mean()) if n_students else None,
+        "score_std": _round(totals.std()) if n_students else None,
+        "kr20": _round(stats["kr20"]),
+        "items": items,
+    }
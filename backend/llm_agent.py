@@ -12,14 +12,23 @@ from langchain.vectorstores import FAISS
 from langchain_community.tools import DuckDuckGoSearchRun
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
-from sqlalchemy import text, inspect
+from sqlalchemy import text, inspect, select
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser  # Make sure this is installed
 from langchain.output_parsers import PydanticOutputParser
-from models import Recommendation, Programme
+from models import Recommendation, ClassRecommendations, Programme
+from answer_sheet import parse_answer_sheet_if_confident
+from llm_cache import llm_cache
+from qcm_renderer import QCM_FORMAT_MODE, render_qcm_markdown
+from qcm_stream import QCMStreamParser, parse_qcm_text
+import asyncio
+import hashlib
 import json
 import re
+import shutil
 import sqlite3
+import threading
+from collections import OrderedDict
 from typing import Annotated, TypedDict
 import os
 
@@ -29,6 +38,14 @@ llm = ChatOpenAI(
     max_tokens=4000
 )
 
+# Modèle déterministe pour l'extraction et la mise en forme : ses réponses
+# peuvent être mises en cache sans changer le comportement
+deterministic_llm = ChatOpenAI(
+    model_name="gpt-4o",
+    temperature=0,
+    max_tokens=4000
+)
+
 QCM_PROMPT_TEMPLATE = PromptTemplate(
     input_variables=["programme"],
     template="""
@@ -89,49 +106,53 @@ Crée des QCM variés, uniques et pédagogiques pour les élèves du cycle 2, sa
     """
 )
 
-def invoke_generate_qcm_agent(prompt, professeur_id, db):
-    # Récupérer le curriculum spécifique du professeur à partir de son ID
-    professor_curriculum = get_professor_curriculum(professeur_id, db)
-    
-    # Si aucun curriculum spécifique n'est trouvé ou s'il est incomplet
-    if not professor_curriculum :
-        # Vérifier si le programme/curriculum est mentionné dans le prompt
-        if "programme" in prompt.lower() or "curriculum" in prompt.lower():
-            # Rechercher le curriculum dans un PDF local
-            pdf_path = "program/cycle2_maths.pdf"
-            retriever = load_pdf_curriculum(pdf_path)
-            
-            if retriever:
-                # Extraire l'information pertinente du PDF
-                results = retriever.get_relevant_documents(prompt)
-                curriculum_info = results[0].page_content if results else "Aucune info trouvée."
-            else:
-                # Rechercher le curriculum en ligne si le PDF n'existe pas
-                curriculum_info = fetch_latest_curriculum() or "Impossible de récupérer le programme."
-                
-                # Sauvegarder ce curriculum pour une utilisation future par le professeur
-                if curriculum_info and curriculum_info != "Impossible de récupérer le programme.":
-                    save_professor_curriculum(professeur_id, curriculum_info)
-            
-            # Utiliser le curriculum trouvé
-            programme_context = curriculum_info
+DEFAULT_PROGRAMME_CONTEXT = "Programme de mathématiques du cycle 2 (CP, CE1, CE2) incluant la numération, le calcul, la géométrie et les mesures."
+
+
+def resolve_programme_context(prompt, professeur_id, professor_curriculum):
+    """
+    Programme à couvrir : celui du professeur, sinon le PDF local ou le site
+    du ministère si le prompt le demande, sinon le programme par défaut.
+    Bloquant (embeddings, recherche web) : à exécuter hors de la boucle asyncio.
+    """
+    # Si un curriculum spécifique est trouvé, l'utiliser
+    if professor_curriculum:
+        return professor_curriculum
+
+    # Vérifier si le programme/curriculum est mentionné dans le prompt
+    if "programme" in prompt.lower() or "curriculum" in prompt.lower():
+        # Rechercher le curriculum dans un PDF local
+        pdf_path = "program/cycle2_maths.pdf"
+        retriever = load_pdf_curriculum(pdf_path)
+        
+        if retriever:
+            # Extraire l'information pertinente du PDF
+            results = retriever.get_relevant_documents(prompt)
+            curriculum_info = results[0].page_content if results else "Aucune info trouvée."
         else:
-            # Utiliser un curriculum par défaut pour le cycle 2
-            programme_context = "Programme de mathématiques du cycle 2 (CP, CE1, CE2) incluant la numération, le calcul, la géométrie et les mesures."
-    else:
-        # Utiliser le curriculum spécifique du professeur
-        programme_context = professor_curriculum
-    
+            # Rechercher le curriculum en ligne si le PDF n'existe pas
+            curriculum_info = fetch_latest_curriculum() or "Impossible de récupérer le programme."
+            
+            # Sauvegarder ce curriculum pour une utilisation future par le professeur
+            if curriculum_info and curriculum_info != "Impossible de récupérer le programme.":
+                save_professor_curriculum(professeur_id, curriculum_info)
+        
+        # Utiliser le curriculum trouvé
+        return curriculum_info
+
+    # Utiliser un curriculum par défaut pour le cycle 2
+    return DEFAULT_PROGRAMME_CONTEXT
+
+
+def build_qcm_request(prompt, programme_context):
     # Enrichir le prompt avec les informations du curriculum si nécessaire
     if "programme" or "curriculum" not in prompt:
-        programme_complet = f"{prompt}\n\nProgramme à couvrir: {programme_context}"
-    else:
-        programme_complet = prompt
-    
-    # Générer le QCM avec le programme complet
-    chain = QCM_PROMPT_TEMPLATE | llm | StrOutputParser()
-    qcm_json = chain.invoke({"programme": programme_complet})
-   
+        return f"{prompt}\n\nProgramme à couvrir: {programme_context}"
+    return prompt
+
+
+def parse_qcm_json(qcm_json):
+    """Extrait l'exercice JSON de la sortie brute du modèle de génération"""
     if not qcm_json:  # Vérifie si la sortie est vide ou None
         raise ValueError("La sortie de l'IA est vide. Vérifie le modèle et le prompt.")
     
@@ -151,27 +172,73 @@ def invoke_generate_qcm_agent(prompt, professeur_id, db):
     except json.JSONDecodeError as e:
         print(f"Erreur JSON: {e}")
         print(f"Sortie brute après nettoyage: {repr(json_content)}")
-        # Tenter une dernière solution - extraire seulement le premier objet JSON valide
-        try:
-            # Trouver les accolades ouvrantes et fermantes correspondantes pour extraire le 1er objet JSON complet
-            depth = 0
-            start_pos = json_content.find('{')
-            
-            if start_pos >= 0:
-                for i in range(start_pos, len(json_content)):
-                    if json_content[i] == '{':
-                        depth += 1
-                    elif json_content[i] == '}':
-                        depth -= 1
-                        if depth == 0:
-                            # On a trouvé un objet JSON complet
-                            return json.loads(json_content[start_pos:i+1])
-        except Exception as e2:
-            print(f"Échec de l'extraction d'un objet JSON valide: {e2}")
-        
+        # Garder les questions valides d'une sortie tronquée ou en partie mal formée
+        parser = parse_qcm_text(json_content)
+        if parser.questions:
+            print(f"Exercice partiel conservé : {len(parser.questions)} question(s) valide(s)")
+            return parser.result()
         raise ValueError(f"Impossible de parser la réponse en JSON: {e}")
 
 
+def invoke_generate_qcm_agent(prompt, professeur_id, db):
+    # Récupérer le curriculum spécifique du professeur à partir de son ID
+    professor_curriculum = get_professor_curriculum(professeur_id, db)
+    programme_context = resolve_programme_context(prompt, professeur_id, professor_curriculum)
+    programme_complet = build_qcm_request(prompt, programme_context)
+    
+    # Générer le QCM avec le programme complet
+    qcm_json = llm_cache.invoke(
+        llm,
+        QCM_PROMPT_TEMPLATE.template,
+        {"programme": programme_complet},
+        QCM_PROMPT_TEMPLATE.format_prompt(programme=programme_complet),
+    )
+    return parse_qcm_json(qcm_json)
+
+
+async def astream_generate_qcm_agent(prompt, professeur_id, db):
+    """
+    Génération en streaming : renvoie les événements de QCMStreamParser
+    ("header", "question", "invalid") au fil de la sortie du modèle, puis
+    ("end", parser) avec tout ce qui a pu être validé.
+    """
+    professor_curriculum = await aget_professor_curriculum(professeur_id, db)
+    programme_context = await asyncio.to_thread(
+        resolve_programme_context, prompt, professeur_id, professor_curriculum
+    )
+    programme_complet = build_qcm_request(prompt, programme_context)
+
+    parser = QCMStreamParser()
+    async for chunk in llm_cache.astream(
+        llm,
+        QCM_PROMPT_TEMPLATE.template,
+        {"programme": programme_complet},
+        QCM_PROMPT_TEMPLATE.format_prompt(programme=programme_complet),
+    ):
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
+    yield ("end", parser)
+
+
+async def ainvoke_generate_qcm_agent(prompt, professeur_id, db):
+    """Version asynchrone de invoke_generate_qcm_agent, db étant une AsyncSession"""
+    professor_curriculum = await aget_professor_curriculum(professeur_id, db)
+    programme_context = await asyncio.to_thread(
+        resolve_programme_context, prompt, professeur_id, professor_curriculum
+    )
+    programme_complet = build_qcm_request(prompt, programme_context)
+
+    qcm_json = await llm_cache.ainvoke(
+        llm,
+        QCM_PROMPT_TEMPLATE.template,
+        {"programme": programme_complet},
+        QCM_PROMPT_TEMPLATE.format_prompt(programme=programme_complet),
+    )
+    return parse_qcm_json(qcm_json)
+
+
 FORMAT_PROMPT = """
 Rôle : system
 content : "Tu es un assistant pédagogique chargé de formater des exercices mathématiques sous forme de QCM pour un examen. Les données brutes fournies sont extraites d'une base de données et doivent être restructurées de manière claire et lisible.  
@@ -209,19 +276,46 @@ D) 7
 def convert_query_result_to_string(query_result):
     return "\n".join([str(record) for record in query_result])
 
-def format_qcm_data(query_result, new_exercise):
+def _format_request(query_result, new_exercise):
     query_result_string = convert_query_result_to_string(f"Exercice {new_exercise.id}  : {query_result}")
     # Définition du prompt utilisateur
     user_prompt = f"Format les données pour la lisibilité avec le numéro de l'exercice en premier et le titre en second {query_result_string}"
-
-    # Envoi des messages au modèle
-    response = llm.invoke([
+    messages = [
         SystemMessage(content=FORMAT_PROMPT),  # System Prompt
         HumanMessage(content=user_prompt)      # Question de l'utilisateur
-    ])
+    ]
+    return {"user_prompt": user_prompt}, messages
 
-    # Affichage de la réponse
-    return response.content
+def _render_locally(query_result, new_exercise):
+    if QCM_FORMAT_MODE == "llm" or not isinstance(query_result, dict):
+        return None
+    return render_qcm_markdown(query_result, new_exercise.id)
+
+def format_qcm_data(query_result, new_exercise):
+    # Rendu local par défaut (QCM_FORMAT_MODE=local), sans appel au modèle
+    rendered = _render_locally(query_result, new_exercise)
+    if rendered is not None:
+        return rendered
+    inputs, messages = _format_request(query_result, new_exercise)
+    # Envoi des messages au modèle
+    return llm_cache.invoke(deterministic_llm, FORMAT_PROMPT, inputs, messages)
+
+async def aformat_qcm_data(query_result, new_exercise):
+    rendered = _render_locally(query_result, new_exercise)
+    if rendered is not None:
+        return rendered
+    inputs, messages = _format_request(query_result, new_exercise)
+    return await llm_cache.ainvoke(deterministic_llm, FORMAT_PROMPT, inputs, messages)
+
+async def astream_format_qcm_data(query_result, new_exercise):
+    """Comme aformat_qcm_data, mais renvoie le texte formaté au fil de sa génération"""
+    rendered = _render_locally(query_result, new_exercise)
+    if rendered is not None:
+        yield rendered
+        return
+    inputs, messages = _format_request(query_result, new_exercise)
+    async for token in llm_cache.astream(deterministic_llm, FORMAT_PROMPT, inputs, messages):
+        yield token
 
 
 EXTRACTION_PROMPT = PromptTemplate(
@@ -253,9 +347,7 @@ Réponse attendue (format JSON) :
 )
 
 
-def invoke_analyze_student_copy_agent(text: str):
-    chain = EXTRACTION_PROMPT | llm | StrOutputParser()
-    qcm_json = chain.invoke({"texte_extrait": text})
+def parse_student_copy_json(qcm_json):
     if not qcm_json:
         raise ValueError("La sortie de l'IA est vide. Vérifie le modèle et le prompt.")
     match = re.search(r"```json\n(.*?)\n```", qcm_json, re.DOTALL)
@@ -271,6 +363,43 @@ def invoke_analyze_student_copy_agent(text: str):
         raise
 
 
+def invoke_analyze_student_copy_agent(text: str):
+    qcm_json = llm_cache.invoke(
+        deterministic_llm,
+        EXTRACTION_PROMPT.template,
+        {"texte_extrait": text},
+        EXTRACTION_PROMPT.format_prompt(texte_extrait=text),
+    )
+    return parse_student_copy_json(qcm_json)
+
+
+async def ainvoke_analyze_student_copy_agent(text: str):
+    qcm_json = await llm_cache.ainvoke(
+        deterministic_llm,
+        EXTRACTION_PROMPT.template,
+        {"texte_extrait": text},
+        EXTRACTION_PROMPT.format_prompt(texte_extrait=text),
+    )
+    return parse_student_copy_json(qcm_json)
+
+
+def analyze_student_copy(text: str):
+    """
+    Structure une copie d'élève. Les copies tapées sur le modèle sont lues
+    localement ; le LLM n'est appelé que si la lecture déterministe échoue.
+    """
+    structured_data = parse_answer_sheet_if_confident(text)
+    if structured_data is not None:
+        return structured_data
+    return invoke_analyze_student_copy_agent(text)
+
+
+async def aanalyze_student_copy(text: str):
+    structured_data = parse_answer_sheet_if_confident(text)
+    if structured_data is not None:
+        return structured_data
+    return await ainvoke_analyze_student_copy_agent(text)
+
 
 def invoke_llm(prompt: str) -> str:
     """
@@ -283,9 +412,15 @@ def invoke_llm(prompt: str) -> str:
     return response
 
 
-def invoke_llm_recommendation_agent(student_name, student_email, performance_details):
-    """Generate personalized recommendations for a student based on their performance"""
-    
+async def ainvoke_llm(prompt: str) -> str:
+    response = await llm.ainvoke([
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=prompt)
+    ])
+    return response.content
+
+
+def _recommendation_request(student_name, student_email, performance_details):
     # Setup the parser
     parser = PydanticOutputParser(pydantic_object=Recommendation)
     
@@ -308,33 +443,220 @@ Les recommandations doivent être spécifiques, actionables et adaptées au nive
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
-    # Create the chain properly
-    chain = student_recommendation_template | llm | parser
-    
-    # Invoke the chain with input variables
-    result = chain.invoke({
+    inputs = {
         "nom_eleve": student_name,
         "email": student_email,
         "performance_details": performance_details
-    })
-    
-    return result 
+    }
+    return parser, student_recommendation_template, inputs
+
+
+def invoke_llm_recommendation_agent(student_name, student_email, performance_details):
+    """Generate personalized recommendations for a student based on their performance"""
+    parser, template, inputs = _recommendation_request(
+        student_name, student_email, performance_details
+    )
+
+    # Invoke the model through the response cache, then parse
+    output = llm_cache.invoke(
+        llm,
+        template.template,
+        inputs,
+        template.format_prompt(**inputs),
+    )
+    return parser.parse(output)
+
+
+async def ainvoke_llm_recommendation_agent(student_name, student_email, performance_details):
+    """Async version of invoke_llm_recommendation_agent"""
+    parser, template, inputs = _recommendation_request(
+        student_name, student_email, performance_details
+    )
+    output = await llm_cache.ainvoke(
+        llm,
+        template.template,
+        inputs,
+        template.format_prompt(**inputs),
+    )
+    return parser.parse(output)
+
+
+def _class_recommendation_request(students):
+    parser = PydanticOutputParser(pydantic_object=ClassRecommendations)
+
+    class_recommendation_template = PromptTemplate(
+        input_variables=["students_details"],
+        template="""
+Tu es un assistant pédagogique intelligent qui aide les professeurs à mieux comprendre les forces et faiblesses de leurs élèves.
+
+Voici les performances de plusieurs élèves, chacun précédé de son identifiant :
+
+{students_details}
+
+Pour chaque élève, génère des recommandations personnalisées pour l'aider à progresser.
+Les recommandations doivent être spécifiques, actionables et adaptées au niveau de l'élève.
+Réponds pour tous les élèves, en reprenant leur identifiant dans eleve_id.
+
+{format_instructions}
+""",
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+
+    students_details = "\n\n".join(
+        f"### Élève {eleve_id} : {student_name} {student_email}\nPerformance par exercice:\n{performance_details}"
+        for eleve_id, student_name, student_email, performance_details in students
+    )
+    inputs = {"students_details": students_details}
+    return parser, class_recommendation_template, inputs
+
+
+async def ainvoke_llm_class_recommendation_agent(students):
+    """
+    Generate the recommendations of several students with a single call.
+
+    Args:
+        students (list): (eleve_id, student_name, student_email, performance_details) tuples
+
+    Returns:
+        dict: {eleve_id: Recommendation} for the students present in the answer
+    """
+    parser, template, inputs = _class_recommendation_request(students)
+    output = await llm_cache.ainvoke(
+        llm,
+        template.template,
+        inputs,
+        template.format_prompt(**inputs),
+    )
+    expected = {eleve_id for eleve_id, *_ in students}
+    return {
+        item.eleve_id: Recommendation(**item.model_dump(exclude={"eleve_id"}))
+        for item in parser.parse(output).students
+        if item.eleve_id in expected
+    }
 
 
 
 # ======================================================
 # PDF CURRICULUM LOADER
 # ======================================================
+# Les index FAISS sont stockés sur disque sous le hash SHA-256 du PDF : deux
+# professeurs qui déposent le même fichier partagent le même index.
+CURRICULUM_INDEX_DIR = os.getenv("CURRICULUM_INDEX_DIR", "curriculum_index")
+# Index FAISS gardés en mémoire (LRU), les autres sont relus depuis le disque
+CURRICULUM_MAX_RETRIEVERS = int(os.getenv("CURRICULUM_MAX_RETRIEVERS", "16"))
+
+# Protège les dictionnaires ci-dessous, jamais tenu pendant un chargement
+_curriculum_lock = threading.Lock()
+_curriculum_build_locks = {}  # hash du PDF -> verrou de son chargement
+_curriculum_retrievers = OrderedDict()  # hash du PDF -> retriever FAISS, LRU
+_curriculum_hashes = {}  # chemin -> (mtime, taille, hash du PDF)
+
+
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    """Calcule le SHA-256 d'un fichier en le lisant par blocs."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_curriculum_hash(pdf_path):
+    """
+    Retourne le hash du contenu d'un PDF de curriculum. Le résultat est mémorisé
+    par (mtime, taille) pour éviter de relire le fichier à chaque requête.
+    """
+    stat = os.stat(pdf_path)
+    cached = _curriculum_hashes.get(pdf_path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+    content_hash = compute_file_hash(pdf_path)
+    _curriculum_hashes[pdf_path] = (stat.st_mtime, stat.st_size, content_hash)
+    return content_hash
+
+
+def build_curriculum_index(pdf_path, index_path, embeddings):
+    """Parse, découpe et vectorise le PDF puis sauvegarde l'index FAISS sur disque."""
+    loader = PyPDFLoader(pdf_path)
+    documents = loader.load()
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    chunks = text_splitter.split_documents(documents)
+    vectorstore = FAISS.from_documents(chunks, embeddings)
+
+    # Écriture dans un dossier temporaire puis renommage, pour ne jamais
+    # exposer un index à moitié écrit à un autre worker
+    os.makedirs(CURRICULUM_INDEX_DIR, exist_ok=True)
+    tmp_path = f"{index_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    vectorstore.save_local(tmp_path)
+    try:
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # Un autre worker a publié le même index entre-temps
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return vectorstore
+
+
+def _cached_retriever(content_hash):
+    with _curriculum_lock:
+        retriever = _curriculum_retrievers.get(content_hash)
+        if retriever is not None:
+            _curriculum_retrievers.move_to_end(content_hash)
+        return retriever
+
+
 def load_pdf_curriculum(pdf_path):
-    if os.path.exists(pdf_path):
-        loader = PyPDFLoader(pdf_path)
-        documents = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        chunks = text_splitter.split_documents(documents)
-        vectorstore = FAISS.from_documents(chunks, OpenAIEmbeddings())
+    if not os.path.exists(pdf_path):
+        return None
+
+    content_hash = get_curriculum_hash(pdf_path)
+    retriever = _cached_retriever(content_hash)
+    if retriever:
+        return retriever
+
+    # Un verrou par contenu : le chargement d'un PDF ne bloque pas les autres
+    with _curriculum_lock:
+        build_lock = _curriculum_build_locks.setdefault(content_hash, threading.Lock())
+    with build_lock:
+        retriever = _cached_retriever(content_hash)
+        if retriever:
+            return retriever
+
+        embeddings = OpenAIEmbeddings()
+        index_path = os.path.join(CURRICULUM_INDEX_DIR, content_hash)
+        vectorstore = None
+        if os.path.isdir(index_path):
+            try:
+                # Index produit par nous-mêmes : la désérialisation est sûre
+                vectorstore = FAISS.load_local(
+                    index_path, embeddings, allow_dangerous_deserialization=True
+                )
+            except Exception as e:
+                print(f"Index du curriculum illisible, reconstruction: {e}")
+                shutil.rmtree(index_path, ignore_errors=True)
+
+        if vectorstore is None:
+            vectorstore = build_curriculum_index(pdf_path, index_path, embeddings)
+
         retriever = vectorstore.as_retriever()
+        with _curriculum_lock:
+            _curriculum_retrievers[content_hash] = retriever
+            while len(_curriculum_retrievers) > CURRICULUM_MAX_RETRIEVERS:
+                _curriculum_retrievers.popitem(last=False)
+            _curriculum_build_locks.pop(content_hash, None)
         return retriever
-    return None
+
+
+def invalidate_curriculum_index(pdf_path):
+    """
+    Oublie le hash mémorisé d'un PDF remplacé par /update_curriculum/.
+
+    L'index FAISS (mémoire et disque) est conservé : il est indexé par le
+    contenu et peut servir à un autre professeur ayant déposé le même PDF.
+    Le nouveau contenu aura son propre hash ; les index orphelins relèvent
+    d'un nettoyage hors ligne.
+    """
+    if pdf_path:
+        _curriculum_hashes.pop(pdf_path, None)
 
 
 def fetch_latest_curriculum():
@@ -394,6 +716,22 @@ def get_professor_curriculum(professeur_id, db):
         print(f"Erreur lors de la récupération du curriculum: {e}")
         return None
 
+async def aget_professor_curriculum(professeur_id, db):
+    """
+    Version asynchrone de get_professor_curriculum (db : AsyncSession). Le
+    chargement de l'index FAISS se fait dans un thread.
+    """
+    try:
+        result = await db.scalar(
+            select(Programme).where(Programme.professeur_id == professeur_id).limit(1)
+        )
+        if result and result.file_path:
+            return await asyncio.to_thread(load_pdf_curriculum, result.file_path)
+        return None
+    except Exception as e:
+        print(f"Erreur lors de la récupération du curriculum: {e}")
+        return None
+
 def save_professor_curriculum(professeur_id, curriculum, db):
     """
     Sauvegarde le curriculum pour un professeur spécifique.
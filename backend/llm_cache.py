@@ -0,0 +1,345 @@
+# llm_cache.py
+"""
+Cache des réponses LLM adressé par contenu.
+
+La clé est le hash (modèle, température, max_tokens, template du prompt,
+entrées rendues). Modes :
+- "on"     : lecture/écriture, uniquement pour les appels déterministes
+             (température 0) sauf si LLM_CACHE_SAMPLED=1
+- "off"    : cache désactivé
+- "record" : chaque appel part au LLM et sa réponse est enregistrée
+- "replay" : aucune requête réseau, un appel absent du cache lève LLMCacheMiss
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Durée de vie en secondes, 0 = pas d'expiration
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Précision de last_access (LRU) : une lecture ne réécrit l'entrée que si
+# son dernier accès enregistré est plus ancien
+LLM_CACHE_TOUCH_INTERVAL_SECONDS = int(os.getenv("LLM_CACHE_TOUCH_INTERVAL_SECONDS", "3600"))
+# L'éviction (LRU) est vérifiée toutes les N écritures, le cache peut donc
+# dépasser LLM_CACHE_MAX_ENTRIES d'au plus N entrées par processus
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+# Autorise la mise en cache des appels à température > 0
+LLM_CACHE_SAMPLED = os.getenv("LLM_CACHE_SAMPLED", "0") == "1"
+
+CACHE_MODES = ("on", "off", "record", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a call has not been recorded"""
+
+
+# ======================================================
+# BACKENDS
+# ======================================================
+class MemoryCacheBackend:
+    """LRU in-process backend, mostly useful for tests and benchmarks"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict(self, max_entries):
+        evicted = 0
+        with self._lock:
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def count(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Disk backend, shared by every worker on the host"""
+
+    def __init__(self, path, touch_interval=3600):
+        self.path = path
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, last_access FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Une lecture reste une lecture : pas de transaction d'écriture à chaque hit
+            now = time.time()
+            if now - row[2] >= self.touch_interval:
+                self._conn.execute(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+            return row[0], row[1]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self, max_entries):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "  SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+                ")",
+                (max_entries,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+# ======================================================
+# CACHE
+# ======================================================
+class LLMCache:
+    def __init__(self, backend, mode="on", max_entries=5000, ttl_seconds=0, allow_sampled=False, evict_every=100):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.backend = backend
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.allow_sampled = allow_sampled
+        self.evict_every = max(1, evict_every)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._stores_since_evict = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, template, inputs, temperature=None, max_tokens=None):
+        """Hash of model name and sampling settings, prompt template and rendered inputs"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "template": template,
+                "inputs": inputs,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _llm_key(self, llm, template, inputs):
+        return self.make_key(
+            getattr(llm, "model_name", str(llm)),
+            template,
+            inputs,
+            temperature=getattr(llm, "temperature", None),
+            max_tokens=getattr(llm, "max_tokens", None),
+        )
+
+    def _is_cacheable(self, llm, allow_sampled):
+        if self.mode in ("record", "replay"):
+            return True
+        if self.mode == "off":
+            return False
+        if allow_sampled is None:
+            allow_sampled = self.allow_sampled
+        return allow_sampled or not getattr(llm, "temperature", 0)
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def lookup(self, key):
+        """Return the cached response or None, honouring the TTL"""
+        if self.mode == "record":
+            return None
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, created_at = entry
+            expired = (
+                self.mode == "on"
+                and self.ttl_seconds
+                and time.time() - created_at > self.ttl_seconds
+            )
+            if not expired:
+                self._count("hits")
+                return value
+            self.backend.delete(key)
+        self._count("misses")
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded LLM response for key {key}")
+        return None
+
+    def store(self, key, value):
+        self.backend.set(key, value)
+        self._count("stores")
+        # Les enregistrements ne sont jamais évincés
+        if self.mode != "on" or not self.max_entries:
+            return
+        with self._lock:
+            self._stores_since_evict += 1
+            if self._stores_since_evict < self.evict_every:
+                return
+            self._stores_since_evict = 0
+        if self.backend.count() > self.max_entries:
+            self._count("evictions", self.backend.evict(self.max_entries))
+
+    def invoke(self, llm, template, inputs, prompt, allow_sampled=None):
+        """
+        Invoke the model through the cache.
+
+        Args:
+            llm: LangChain chat model
+            template (str): Prompt template (or system prompt) of the agent
+            inputs (dict): Values rendered into the template
+            prompt: PromptValue or list of messages sent to the model
+            allow_sampled (bool, optional): Cache even if temperature > 0
+
+        Returns:
+            str: Content of the model response
+        """
+        if not self._is_cacheable(llm, allow_sampled):
+            return llm.invoke(prompt).content
+
+        key = self._llm_key(llm, template, inputs)
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+
+        content = llm.invoke(prompt).content
+        if content:
+            self.store(key, content)
+        return content
+
+    async def ainvoke(self, llm, template, inputs, prompt, allow_sampled=None):
+        """
+        Async counterpart of invoke: the model is awaited with ainvoke and the
+        backend is accessed from a worker thread, so the event loop never blocks.
+        """
+        if not self._is_cacheable(llm, allow_sampled):
+            return (await llm.ainvoke(prompt)).content
+
+        key = self._llm_key(llm, template, inputs)
+        cached = await asyncio.to_thread(self.lookup, key)
+        if cached is not None:
+            return cached
+
+        content = (await llm.ainvoke(prompt)).content
+        if content:
+            await asyncio.to_thread(self.store, key, content)
+        return content
+
+    async def astream(self, llm, template, inputs, prompt, allow_sampled=None):
+        """
+        Stream the response chunks as the model produces them. A cached
+        response is yielded in a single chunk; a streamed one is stored once complete.
+        """
+        key = None
+        if self._is_cacheable(llm, allow_sampled):
+            key = self._llm_key(llm, template, inputs)
+            cached = await asyncio.to_thread(self.lookup, key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        async for chunk in llm.astream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+
+        content = "".join(parts)
+        if key and content:
+            await asyncio.to_thread(self.store, key, content)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.count(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+def create_llm_cache():
+    if LLM_CACHE_BACKEND == "memory":
+        backend = MemoryCacheBackend()
+    else:
+        backend = SQLiteCacheBackend(LLM_CACHE_PATH, touch_interval=LLM_CACHE_TOUCH_INTERVAL_SECONDS)
+    return LLMCache(
+        backend,
+        mode=LLM_CACHE_MODE,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds=LLM_CACHE_TTL_SECONDS,
+        allow_sampled=LLM_CACHE_SAMPLED,
+        evict_every=LLM_CACHE_EVICT_EVERY,
+    )
+
+
+llm_cache = create_llm_cache()
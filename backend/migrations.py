@@ -0,0 +1,262 @@
+# migrations.py
+"""
+Migrations versionnées du schéma.
+
+Base.metadata.create_all crée les tables manquantes ; les migrations ci-dessous
+font évoluer les bases existantes (eduIA.db en production) sur place. Chaque
+version appliquée est enregistrée dans la table schema_migrations, et chaque
+migration est écrite pour être sans effet sur une base neuve.
+
+Usage :
+    python migrations.py           # applique les migrations en attente
+    python migrations.py --status  # liste les versions appliquées
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register a migration function taking a connection"""
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return register
+
+
+def _add_column_if_missing(conn, table, column, ddl):
+    existing_columns = [col["name"] for col in inspect(conn).get_columns(table)]
+    if column not in existing_columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        print(f"Added {column} column to {table} table")
+
+
+# ======================================================
+# MIGRATIONS
+# ======================================================
+@migration(1, "programmes_file_path")
+def add_programme_file_path(conn):
+    _add_column_if_missing(conn, "programmes", "file_path", "VARCHAR")
+
+
+@migration(2, "submission_copy_hash")
+def add_submission_copy_hash(conn):
+    _add_column_if_missing(
+        conn, "soumissions", "copie_sha256", "VARCHAR REFERENCES submission_blobs (sha256)"
+    )
+    _add_column_if_missing(
+        conn, "grading_jobs", "copie_sha256", "VARCHAR REFERENCES submission_blobs (sha256)"
+    )
+
+
+@migration(3, "unique_submission_answer")
+def add_unique_submission_answer(conn):
+    # Doublons laissés par l'ancien SELECT puis INSERT : on garde la dernière réponse
+    conn.execute(text("""
+        DELETE FROM soumissions
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM soumissions
+            GROUP BY eleve_id, exercice_id, question
+        )
+    """))
+    conn.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_soumissions_eleve_exercice_question
+        ON soumissions (eleve_id, exercice_id, question)
+    """))
+
+
+@migration(4, "hot_path_indexes")
+def add_hot_path_indexes(conn):
+    # soumissions (eleve_id, exercice_id) est couvert par le préfixe de
+    # uq_soumissions_eleve_exercice_question
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_soumissions_exercice_eleve ON soumissions (exercice_id, eleve_id)",
+        "CREATE INDEX IF NOT EXISTS ix_resultats_exercice_eleve ON resultats (exercice_id, eleve_id)",
+        "CREATE INDEX IF NOT EXISTS ix_exercices_professeur ON exercices (professeur_id)",
+        "CREATE INDEX IF NOT EXISTS ix_qcms_exercice ON qcms (exercice_id)",
+        "CREATE INDEX IF NOT EXISTS ix_qcm_reponses_qcm ON qcm_reponses (qcm_id)",
+        # Colonne ajoutée par la migration 2, sans l'index déclaré dans models.py
+        "CREATE INDEX IF NOT EXISTS ix_soumissions_copie_sha256 ON soumissions (copie_sha256)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+    # Statistiques à jour pour que le planificateur choisisse les nouveaux index
+    conn.execute(text("ANALYZE"))
+
+
+@migration(5, "dashboard_rollups")
+def add_dashboard_rollups(conn):
+    _add_column_if_missing(conn, "resultats", "date_resultat", "TIMESTAMP")
+    # Résultats existants : rattachés à la date de la copie corrigée
+    conn.execute(text("""
+        UPDATE resultats
+        SET date_resultat = (
+            SELECT MAX(s.date_soumission) FROM soumissions s
+            WHERE s.eleve_id = resultats.eleve_id AND s.exercice_id = resultats.exercice_id
+        )
+        WHERE date_resultat IS NULL
+    """))
+    conn.execute(text(
+        "UPDATE resultats SET date_resultat = CURRENT_TIMESTAMP WHERE date_resultat IS NULL"
+    ))
+
+    from sqlalchemy.orm import Session
+    from dashboard_rollups import rebuild_dashboard_rollups
+    from models import Copie, DashboardRollup
+
+    DashboardRollup.__table__.create(conn, checkfirst=True)
+    # Lue par rebuild_dashboard_rollups, remplie par la migration 9
+    Copie.__table__.create(conn, checkfirst=True)
+    with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+        rebuild_dashboard_rollups(db)
+
+
+@migration(6, "recommendation_data_version")
+def add_recommendation_data_version(conn):
+    _add_column_if_missing(conn, "soumissions", "date_maj", "TIMESTAMP")
+    _add_column_if_missing(conn, "resultats", "date_maj", "TIMESTAMP")
+    conn.execute(text(
+        "UPDATE soumissions SET date_maj = date_soumission WHERE date_maj IS NULL"
+    ))
+    conn.execute(text(
+        "UPDATE resultats SET date_maj = date_resultat WHERE date_maj IS NULL"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_resultats_eleve ON resultats (eleve_id)"
+    ))
+
+
+@migration(7, "unique_student_result")
+def add_unique_student_result(conn):
+    # save_student_result ne créait qu'un résultat par couple, mais rien ne
+    # l'imposait : on garde le dernier, puis on recalcule les rollups
+    deleted = conn.execute(text("""
+        DELETE FROM resultats
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM resultats
+            GROUP BY exercice_id, eleve_id
+        )
+    """)).rowcount
+    conn.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_resultats_exercice_eleve
+        ON resultats (exercice_id, eleve_id)
+    """))
+    # Remplacé par l'index unique sur les mêmes colonnes
+    conn.execute(text("DROP INDEX IF EXISTS ix_resultats_exercice_eleve"))
+
+    if deleted:
+        from sqlalchemy.orm import Session
+        from dashboard_rollups import rebuild_dashboard_rollups
+
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+            rebuild_dashboard_rollups(db)
+
+
+@migration(8, "normalized_answer_codes")
+def add_normalized_answer_codes(conn):
+    _add_column_if_missing(conn, "qcms", "code_question", "VARCHAR")
+    _add_column_if_missing(conn, "qcm_reponses", "code_lettre", "VARCHAR")
+    _add_column_if_missing(conn, "soumissions", "code_question", "VARCHAR")
+    _add_column_if_missing(conn, "soumissions", "code_reponse", "VARCHAR")
+    # Même normalisation que answer_key.normalize_code
+    statements = [
+        "UPDATE qcms SET code_question = UPPER(TRIM(exercice_qcm_id)) WHERE code_question IS NULL",
+        "UPDATE qcm_reponses SET code_lettre = UPPER(TRIM(lettre)) WHERE code_lettre IS NULL",
+        """UPDATE soumissions SET code_question = UPPER(TRIM(question)), code_reponse = UPPER(TRIM(answer))
+           WHERE code_question IS NULL""",
+        "CREATE INDEX IF NOT EXISTS ix_qcms_exercice_code ON qcms (exercice_id, code_question)",
+        # Préfixe de ix_qcms_exercice_code
+        "DROP INDEX IF EXISTS ix_qcms_exercice",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(9, "copies_first_submission")
+def add_copies_first_submission(conn):
+    from sqlalchemy.orm import Session
+    from dashboard_rollups import rebuild_dashboard_rollups
+    from models import Copie
+
+    Copie.__table__.create(conn, checkfirst=True)
+    # date_soumission est réécrite à chaque nouvel envoi : la plus ancienne
+    # date restante est la meilleure approximation de la première soumission
+    conn.execute(text("""
+        INSERT INTO copies (eleve_id, exercice_id, date_premiere_soumission)
+        SELECT s.eleve_id, s.exercice_id, MIN(COALESCE(s.date_soumission, CURRENT_TIMESTAMP))
+        FROM soumissions s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM copies c
+            WHERE c.eleve_id = s.eleve_id AND c.exercice_id = s.exercice_id
+        )
+        GROUP BY s.eleve_id, s.exercice_id
+    """))
+    with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+        rebuild_dashboard_rollups(db)
+
+
+@migration(10, "automatic_result_score")
+def add_automatic_result_score(conn):
+    # NULL : résultats déjà présents, traités comme saisis à la main
+    _add_column_if_missing(conn, "resultats", "score_auto", "INTEGER")
+
+
+# ======================================================
+# EXECUTION
+# ======================================================
+def _ensure_migrations_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR NOT NULL,
+                applied_at TIMESTAMP NOT NULL
+            )
+        """))
+
+
+def get_applied_versions(engine):
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT version FROM schema_migrations")).fetchall()
+    return {row.version for row in rows}
+
+
+def run_migrations(engine):
+    """
+    Apply pending migrations in version order, each in its own transaction.
+
+    Returns:
+        list: Versions applied by this call
+    """
+    applied = get_applied_versions(engine)
+    newly_applied = []
+    for version, name, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            func(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.utcnow()},
+            )
+        print(f"Applied migration {version:03d} {name}")
+        newly_applied.append(version)
+    return newly_applied
+
+
+if __name__ == "__main__":
+    from database import engine, Base
+    import models  # noqa: F401  (registers the tables)
+
+    if "--status" in sys.argv:
+        applied = get_applied_versions(engine)
+        for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            print(f"{version:03d} {name}: {'applied' if version in applied else 'pending'}")
+    else:
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        print("✅ Database schema is up to date")
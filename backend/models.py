@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class Eleve(Base):
     __tablename__ = "eleves"
@@ -49,50 +49,160 @@ class Exercice(Base):
     soumissions = relationship("Soumission", back_populates="exercice")
     resultats = relationship("Resultat", back_populates="exercice")
 
+    __table_args__ = (
+        Index("ix_exercices_professeur", "professeur_id"),
+    )
+
 class QCM(Base):
     __tablename__ = "qcms"
     id = Column(Integer, primary_key=True, index=True)
-    exercice_qcm_id = Column(Integer)
+    # Question code such as "Q1", matched against soumissions.question
+    exercice_qcm_id = Column(String)
+    # exercice_qcm_id normalisé (answer_key.normalize_code)
+    code_question = Column(String)
     question = Column(String)
     exercice_id = Column(Integer, ForeignKey("exercices.id"))
     
     exercice = relationship("Exercice", back_populates="qcms")
     reponses = relationship("QCMReponse", back_populates="qcm")
 
+    __table_args__ = (
+        # Per-exercise lookups and the answer matching of bulk scoring
+        Index("ix_qcms_exercice_code", "exercice_id", "code_question"),
+    )
+
 class QCMReponse(Base):
     __tablename__ = "qcm_reponses"
     id = Column(Integer, primary_key=True, index=True)
     texte = Column(String)
     est_correct = Column(Boolean, default=False)
     lettre = Column(String)
+    # lettre normalisée (answer_key.normalize_code)
+    code_lettre = Column(String)
     qcm_id = Column(Integer, ForeignKey("qcms.id"))
     
     qcm = relationship("QCM", back_populates="reponses")
 
+    __table_args__ = (
+        Index("ix_qcm_reponses_qcm", "qcm_id"),
+    )
+
 class Soumission(Base):
     __tablename__ = "soumissions"
     id = Column(Integer, primary_key=True, index=True)
     date_soumission = Column(DateTime, default=datetime.utcnow)
     question = Column(String)
     answer = Column(String)
+    # question et answer normalisées, comparées au corrigé
+    code_question = Column(String)
+    code_reponse = Column(String)
     eleve_id = Column(Integer, ForeignKey("eleves.id"))
     exercice_id = Column(Integer, ForeignKey("exercices.id"))
+    copie_sha256 = Column(String, ForeignKey("submission_blobs.sha256"), index=True)
+    # Dernière écriture de la réponse, version des données de l'élève
+    date_maj = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     eleve = relationship("Eleve", back_populates="soumissions")
     exercice = relationship("Exercice", back_populates="soumissions")
+
+    __table_args__ = (
+        # One answer per student and question, target of the submission upsert
+        Index("uq_soumissions_eleve_exercice_question", "eleve_id", "exercice_id", "question", unique=True),
+        # Per-exercise lookups; (eleve_id, exercice_id) is the prefix of the unique index
+        Index("ix_soumissions_exercice_eleve", "exercice_id", "eleve_id"),
+    )
    
 
 class Resultat(Base):
     __tablename__ = "resultats"
     id = Column(Integer, primary_key=True, index=True)
     score = Column(Integer)
+    # Dernier score calculé par bulk_scoring ; score différent (ou NULL) = saisie manuelle
+    score_auto = Column(Integer)
+    # Date d'enregistrement du résultat, mois de rattachement dans dashboard_rollups
+    date_resultat = Column(DateTime, default=datetime.utcnow)
+    date_maj = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     eleve_id = Column(Integer, ForeignKey("eleves.id"))
     exercice_id = Column(Integer, ForeignKey("exercices.id"))
     
     eleve = relationship("Eleve", back_populates="resultats")
     exercice = relationship("Exercice", back_populates="resultats")
+
+    __table_args__ = (
+        # One result per student and exercise, target of the bulk scoring upsert
+        Index("uq_resultats_exercice_eleve", "exercice_id", "eleve_id", unique=True),
+        # Per-student lookups (recommendation data version)
+        Index("ix_resultats_eleve", "eleve_id"),
+    )
    
+
+
+class DashboardRollup(Base):
+    """Per-professor monthly aggregates behind /metrics, maintained on write"""
+    __tablename__ = "dashboard_rollups"
+    # 0 for exercises without a professor
+    professeur_id = Column(Integer, primary_key=True)
+    mois = Column(String, primary_key=True)  # YYYY-MM
+    score_sum = Column(Integer, nullable=False, default=0)
+    result_count = Column(Integer, nullable=False, default=0)
+    copies_count = Column(Integer, nullable=False, default=0)
+
+
+class Copie(Base):
+    """One row per student/exercise pair, the month a copy is counted in dashboard_rollups"""
+    __tablename__ = "copies"
+    eleve_id = Column(Integer, ForeignKey("eleves.id"), primary_key=True)
+    exercice_id = Column(Integer, ForeignKey("exercices.id"), primary_key=True)
+    # date_soumission de la première réponse reçue, jamais réécrite
+    date_premiere_soumission = Column(DateTime, nullable=False)
+
+
+class StudentRecommendation(Base):
+    """Last generated recommendations of a student, with the data version they were built from"""
+    __tablename__ = "recommendations"
+    professeur_id = Column(Integer, ForeignKey("professeurs.id"), primary_key=True)
+    eleve_id = Column(Integer, ForeignKey("eleves.id"), primary_key=True)
+    # 0 for the global recommendations of the student
+    exercice_id = Column(Integer, primary_key=True, default=0)
+    data_version = Column(String, nullable=False)
+    contenu = Column(Text, nullable=False)  # Recommendation en JSON
+    date_generation = Column(DateTime, default=datetime.utcnow)
+
+
+class RevokedToken(Base):
+    """Tokens revoked by /logout/, shared by every worker until they expire"""
+    __tablename__ = "revoked_tokens"
+    token_hash = Column(String, primary_key=True)  # principal_cache.token_key
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class SubmissionBlob(Base):
+    __tablename__ = "submission_blobs"
+    sha256 = Column(String, primary_key=True)
+    file_path = Column(String)
+    taille = Column(Integer)
+    compresse = Column(Boolean, default=False)
+    texte_extrait = Column(Text)
+    date_creation = Column(DateTime, default=datetime.utcnow)
+
+
+class GradingJob(Base):
+    __tablename__ = "grading_jobs"
+    id = Column(String, primary_key=True, index=True)
+    professeur_id = Column(Integer, ForeignKey("professeurs.id"), index=True)
+    status = Column(String, default="queued", index=True)
+    stage = Column(String, default="queued")
+    progress = Column(Integer, default=0)
+    filename = Column(String)
+    file_path = Column(String)
+    copie_sha256 = Column(String, ForeignKey("submission_blobs.sha256"))
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     
 # Modèle pour les recommandations structurées
 class Recommendation(BaseModel):
@@ -101,3 +211,33 @@ class Recommendation(BaseModel):
     recommendations: List[str] = Field(description="Recommandations spécifiques pour aider l'élève")
     resources: List[str] = Field(description="Ressources ou exercices suggérés")
 
+
+# Plusieurs élèves dans un même prompt (précalcul des recommandations d'une classe)
+class StudentRecommendationItem(Recommendation):
+    eleve_id: int = Field(description="Identifiant de l'élève, tel que donné dans le prompt")
+
+
+class ClassRecommendations(BaseModel):
+    students: List[StudentRecommendationItem] = Field(description="Une entrée par élève")
+
+
+
+# Schémas d'un exercice QCM tel que produit par le modèle de génération
+class QCMReponseSchema(BaseModel):
+    texte: str
+    est_correct: bool = False
+    lettre: str
+
+
+class QCMQuestionSchema(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    question: str
+    id_qcm: str
+    reponses: List[QCMReponseSchema]
+
+
+class QCMExerciceSchema(BaseModel):
+    titre: str
+    contenu: str
+    qcm: List[QCMQuestionSchema]
@@ -0,0 +1,78 @@
+# pagination.py
+"""
+Pagination par clé (keyset) et projection de champs des listes du tableau de bord.
+
+Le curseur est opaque pour le client : les valeurs des clés de tri de la
+dernière ligne renvoyée, en JSON encodé base64. La page suivante reprend
+strictement après ces valeurs (WHERE (clés) > (curseur)), sans OFFSET : le
+coût d'une page ne dépend pas de sa position dans la liste.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def encode_cursor(values):
+    """Opaque cursor from the sort key values of the last row of a page"""
+    payload = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """
+    Sort key values of a cursor.
+
+    Args:
+        cursor (str): Cursor returned by a previous page, or None for the first page
+        size (int): Number of sort keys of the list
+
+    Returns:
+        list: Sort key values, or None for the first page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_fields(fields, allowed):
+    """
+    Requested fields of a fields=a,b,c parameter.
+
+    Returns:
+        tuple: Fields in the order of allowed, or all of them if fields is empty
+
+    Raises:
+        ValueError: If a field does not exist
+    """
+    if not fields:
+        return tuple(allowed)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(field for field in allowed if field in requested)
+
+
+def keyset_page(rows, limit, sort_key):
+    """
+    Split rows fetched with LIMIT limit + 1 into the page and the next cursor.
+
+    Returns:
+        tuple: (rows of the page, next cursor or None on the last page)
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_key(rows[-1]))
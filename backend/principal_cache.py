@@ -0,0 +1,170 @@
+# principal_cache.py
+"""
+Cache des professeurs authentifiés, indexé par jeton.
+
+get_current_professeur vérifie le JWT une seule fois puis garde le
+professeur (id, nom, email) en mémoire : les requêtes suivantes avec le même
+jeton ne décodent plus le JWT et ne lisent plus la base. Une entrée expire
+au plus tard avec son jeton, sinon après PRINCIPAL_CACHE_TTL_SECONDS.
+
+Révocation : /logout/ enregistre le hash du jeton dans la table
+revoked_tokens (save_revocation) et l'applique aussitôt dans son processus.
+Chaque processus relit les révocations récentes au plus toutes les
+PRINCIPAL_REVOCATION_SYNC_SECONDS (toutes celles non expirées au
+démarrage) : un jeton révoqué est refusé par tous les workers, y compris
+après un redémarrage, jusqu'à son expiration.
+"""
+import calendar
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from models import RevokedToken
+
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+# Délai maximal avant qu'une révocation faite par un autre worker soit appliquée
+PRINCIPAL_REVOCATION_SYNC_SECONDS = int(os.getenv("PRINCIPAL_REVOCATION_SYNC_SECONDS", "5"))
+
+# Professeur détaché de toute session, suffisant pour les endpoints (id, nom, email)
+Principal = namedtuple("Principal", ["id", "nom", "email"])
+
+
+def token_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def save_revocation(db, token, token_expires_at):
+    """Persist the revocation of a token and drop the expired ones, then commit"""
+    db.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+    db.merge(RevokedToken(
+        token_hash=token_key(token),
+        expires_at=datetime.utcfromtimestamp(token_expires_at),
+        revoked_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+
+def load_revocations(db, since=None):
+    """
+    Revocations recorded since a date (all unexpired ones if None).
+
+    Returns:
+        list: (token_hash, expiration timestamp) tuples
+    """
+    query = select(RevokedToken.token_hash, RevokedToken.expires_at).where(
+        RevokedToken.expires_at >= datetime.utcnow()
+    )
+    if since is not None:
+        query = query.where(RevokedToken.revoked_at >= since)
+    return [
+        (token_hash, calendar.timegm(expires_at.utctimetuple()))
+        for token_hash, expires_at in db.execute(query).all()
+    ]
+
+
+class PrincipalCache:
+    def __init__(self, max_entries=10000, ttl_seconds=300, sync_seconds=5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        # Date (UTC) de la dernière lecture de revoked_tokens, None avant la première
+        self._synced_at = None
+        self._next_sync = 0.0
+        self.hits = 0
+        self.misses = 0
+        # clé -> (Principal, expiration)
+        self._entries = OrderedDict()
+        # clé -> expiration du jeton révoqué
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Cached principal of a token, or None"""
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token, principal, token_expires_at):
+        """
+        Cache the principal of a verified token.
+
+        Args:
+            token (str): Raw bearer token
+            principal (Principal): Professor the token belongs to
+            token_expires_at (float): exp claim of the token (timestamp)
+        """
+        expires_at = min(time.time() + self.ttl_seconds, token_expires_at)
+        with self._lock:
+            self._entries[token_key(token)] = (principal, expires_at)
+            self._entries.move_to_end(token_key(token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, token):
+        with self._lock:
+            return token_key(token) in self._revoked
+
+    def revoke_token(self, token, token_expires_at):
+        """Refuse a token until it expires (logout)"""
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            # Les jetons expirés n'ont plus besoin d'être retenus
+            self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            self._revoked[key] = token_expires_at
+
+    def sync_since(self):
+        """
+        Whether revoked_tokens must be read again, and from which date.
+
+        Returns:
+            tuple: (due, since); since is None for the first, full read
+        """
+        with self._lock:
+            if time.time() < self._next_sync:
+                return False, None
+            # Recouvrement d'un intervalle : révocations validées pendant la lecture précédente
+            if self._synced_at is None:
+                return True, None
+            return True, datetime.utcfromtimestamp(
+                calendar.timegm(self._synced_at.utctimetuple()) - self.sync_seconds
+            )
+
+    def apply_revocations(self, revocations, synced_at):
+        """Revoke (token_hash, expiration) pairs read from revoked_tokens"""
+        with self._lock:
+            for key, token_expires_at in revocations:
+                self._entries.pop(key, None)
+                self._revoked[key] = token_expires_at
+            self._synced_at = synced_at
+            self._next_sync = time.time() + self.sync_seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+            self._synced_at = None
+            self._next_sync = 0.0
+
+
+principal_cache = PrincipalCache(
+    max_entries=PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+    sync_seconds=PRINCIPAL_REVOCATION_SYNC_SECONDS,
+)
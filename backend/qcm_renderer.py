@@ -0,0 +1,67 @@
+# qcm_renderer.py
+"""
+Mise en forme locale des exercices QCM, à la place de l'appel LLM de
+format_qcm_data. Produit la présentation décrite dans FORMAT_PROMPT :
+
+    **Exercice 12**
+    **Titre : Aventure Mathématique au Pays des Nombres**
+    **Introduction :** Bienvenue dans l'aventure ...
+
+    **Question 1 :**
+    Le petit lapin a 10 bonbons ...
+
+    A) 4
+    B) 6
+
+    **Réponse correcte :** B) 6
+
+Le rendu est déterministe : même exercice, même texte.
+"""
+import os
+
+# "local" : rendu par ce module ; "llm" : mise en forme par le modèle (FORMAT_PROMPT)
+QCM_FORMAT_MODE = os.getenv("QCM_FORMAT_MODE", "local")
+
+
+def _sorted_answers(reponses):
+    return sorted(reponses or [], key=lambda rep: str(rep.get("lettre") or ""))
+
+
+def render_question(number, question):
+    """Markdown of one question, its A-D options and the correct answer"""
+    lines = [f"**Question {number} :**  ", question.get("question", ""), ""]
+    correct = None
+    for rep in _sorted_answers(question.get("reponses")):
+        option = f"{rep.get('lettre')}) {rep.get('texte')}"
+        lines.append(f"{option}  ")
+        if rep.get("est_correct") and correct is None:
+            correct = option
+    if correct:
+        lines += ["", f"**Réponse correcte :** {correct}"]
+    return "\n".join(lines)
+
+
+def render_qcm_markdown(qcm_data, exercise_id=None):
+    """
+    Render an exercise as markdown.
+
+    Args:
+        qcm_data (dict): Exercise with titre, contenu and qcm (list of questions),
+                         as produced by the generation model or get_qcm_exercise
+        exercise_id (int, optional): Id of the saved exercise, shown first
+
+    Returns:
+        str: Formatted exercise
+    """
+    blocks = []
+    header = []
+    if exercise_id is not None:
+        header.append(f"**Exercice {exercise_id}**  ")
+    header.append(f"**Titre : {qcm_data.get('titre', '')}**  ")
+    if qcm_data.get("contenu"):
+        header.append(f"**Introduction :** {qcm_data['contenu']}")
+    blocks.append("\n".join(header))
+
+    for number, question in enumerate(qcm_data.get("qcm") or [], start=1):
+        blocks.append(render_question(number, question))
+    return "\n\n".join(blocks) + "\n"
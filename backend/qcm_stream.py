@@ -0,0 +1,175 @@
+# qcm_stream.py
+"""
+Lecture incrémentale de la sortie JSON du modèle de génération de QCM.
+
+Le texte est lu au fil des morceaux reçus : chaque question du tableau "qcm"
+est extraite dès que son accolade fermante arrive, puis validée avec
+QCMQuestionSchema. Une fin de réponse tronquée ou mal formée ne fait perdre
+que la question en cours, pas l'exercice entier. Le texte autour de l'objet
+JSON (bloc ```json, commentaires du modèle) est ignoré.
+"""
+import json
+
+from pydantic import ValidationError
+
+from models import QCMQuestionSchema
+
+HEADER_KEYS = ("titre", "contenu")
+
+
+class QCMStreamParser:
+    """
+    Feed the model output chunk by chunk with feed(); each call returns the
+    events completed by that chunk:
+
+    - ("header", {"titre": ..., "contenu": ...}) when the question list starts
+    - ("question", dict) for each question that passes schema validation
+    - ("invalid", str) for a question that could not be parsed or validated
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.header = {}
+        self.questions = []
+        self.invalid = 0
+        self.complete = False
+        self._header_sent = False
+        # Conteneurs ouverts : type, clé dans le parent, dernière clé lue, début
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+
+    def feed(self, chunk):
+        events = []
+        if self.complete or not chunk:
+            return events
+        self.text += chunk
+        text = self.text
+
+        for i in range(self.position, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string(text[self._string_start:i + 1], events)
+                continue
+
+            if not self._stack and char != "{":
+                # Avant l'objet JSON : bloc markdown ou texte libre
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == "{":
+                self._open("object", i, events)
+            elif char == "[":
+                self._open("array", i, events)
+            elif char in "}]":
+                self._close(text, i, events)
+                if not self._stack:
+                    self.complete = True
+                    break
+            elif char == "," and self._stack[-1]["type"] == "object":
+                self._stack[-1]["expect_key"] = True
+            elif char == ":" and self._stack[-1]["type"] == "object":
+                self._stack[-1]["expect_key"] = False
+
+        self.position = len(text)
+        return events
+
+    def close(self):
+        """
+        Events left when the stream ends (the header of an exercise without
+        any question list).
+        """
+        events = []
+        self._send_header(events)
+        return events
+
+    # ------------------------------------------------------
+    def _parent_key(self):
+        if self._stack and self._stack[-1]["type"] == "object":
+            return self._stack[-1]["current_key"]
+        return None
+
+    def _open(self, kind, index, events):
+        key = self._parent_key()
+        # Une question = un objet du tableau "qcm" de l'objet racine
+        is_question = (
+            kind == "object"
+            and len(self._stack) == 2
+            and self._stack[-1]["type"] == "array"
+            and self._stack[-1]["key"] == "qcm"
+        )
+        if kind == "array" and len(self._stack) == 1 and key == "qcm":
+            self._send_header(events)
+        self._stack.append({
+            "type": kind,
+            "key": key,
+            "expect_key": kind == "object",
+            "current_key": None,
+            "start": index,
+            "question": is_question,
+        })
+
+    def _close(self, text, index, events):
+        frame = self._stack.pop()
+        if frame["question"]:
+            self._on_question(text[frame["start"]:index + 1], events)
+
+    def _on_string(self, literal, events):
+        frame = self._stack[-1] if self._stack else None
+        if not frame or frame["type"] != "object":
+            return
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError:
+            return
+        if frame["expect_key"]:
+            frame["current_key"] = value
+        elif len(self._stack) == 1 and frame["current_key"] in HEADER_KEYS:
+            self.header[frame["current_key"]] = value
+
+    def _send_header(self, events):
+        if not self._header_sent:
+            self._header_sent = True
+            events.append(("header", dict(self.header)))
+
+    def _on_question(self, raw, events):
+        try:
+            question = QCMQuestionSchema.model_validate(json.loads(raw)).model_dump()
+        except (json.JSONDecodeError, ValidationError) as e:
+            self.invalid += 1
+            print(f"Question QCM ignorée : {e}")
+            events.append(("invalid", raw))
+            return
+        self.questions.append(question)
+        events.append(("question", question))
+
+    def result(self):
+        """Exercise built from everything valid received so far"""
+        return {
+            "titre": self.header.get("titre", ""),
+            "contenu": self.header.get("contenu", ""),
+            "qcm": list(self.questions),
+        }
+
+
+def parse_qcm_text(text):
+    """
+    Parse a complete model output, keeping the valid questions of a
+    truncated or partly malformed answer.
+
+    Returns:
+        QCMStreamParser: Parser holding header, questions and completion state
+    """
+    parser = QCMStreamParser()
+    parser.feed(text)
+    parser.close()
+    return parser
@@ -0,0 +1,106 @@
+# recommendation_batch.py
+"""
+Précalcul des recommandations globales de toute une classe.
+
+Les performances et les versions de données de tous les élèves d'un
+professeur sont lues en quelques requêtes groupées ; seuls les élèves dont
+la recommandation enregistrée n'est plus à jour sont régénérés, avec au plus
+RECOMMENDATION_BATCH_CONCURRENCY appels LLM simultanés. Avec
+RECOMMENDATION_BATCH_PACK_SIZE > 1, plusieurs élèves partagent un même
+prompt ; un élève absent de la réponse est régénéré seul, et l'échec d'un
+élève n'empêche pas d'enregistrer les autres.
+
+Les résultats sont enregistrés au fil de l'eau dans la table recommendations,
+où /recommendations/student/{eleve_id} les relit.
+"""
+import asyncio
+import os
+
+from database import AsyncSessionLocal
+from llm_agent import ainvoke_llm_class_recommendation_agent, ainvoke_llm_recommendation_agent
+from recommendation_store import (
+    GLOBAL_SCOPE,
+    get_class_data_versions,
+    get_stored_versions,
+    save_recommendation,
+)
+from utils import get_class_global_performance
+
+RECOMMENDATION_BATCH_CONCURRENCY = int(os.getenv("RECOMMENDATION_BATCH_CONCURRENCY", "4"))
+RECOMMENDATION_BATCH_PACK_SIZE = int(os.getenv("RECOMMENDATION_BATCH_PACK_SIZE", "1"))
+
+
+async def _generate(students, semaphore):
+    """
+    Recommendations of a group of students, {eleve_id: Recommendation}.
+    Students whose generation failed are missing from the result.
+    """
+    generated = {}
+    if len(students) > 1:
+        async with semaphore:
+            try:
+                generated = await ainvoke_llm_class_recommendation_agent(students)
+            except Exception as e:
+                print(f"Packed recommendation call failed, falling back to one call per student: {e}")
+
+    async def generate_one(eleve_id, nom, email, performance):
+        async with semaphore:
+            try:
+                return eleve_id, await ainvoke_llm_recommendation_agent(nom, email, performance)
+            except Exception as e:
+                print(f"Recommendation failed for student {eleve_id}: {e}")
+                return eleve_id, None
+
+    missing = [student for student in students if student[0] not in generated]
+    for eleve_id, recommendation in await asyncio.gather(*(generate_one(*s) for s in missing)):
+        if recommendation is not None:
+            generated[eleve_id] = recommendation
+    return generated
+
+
+async def precompute_class_recommendations(professeur_id, refresh=False, pack_size=None, concurrency=None):
+    """
+    Generate and store the global recommendations of every student of a professor.
+
+    Args:
+        professeur_id (int): Professor whose students are processed
+        refresh (bool): Regenerate even the recommendations that are up to date
+        pack_size (int, optional): Students per prompt, RECOMMENDATION_BATCH_PACK_SIZE by default
+        concurrency (int, optional): Simultaneous LLM calls, RECOMMENDATION_BATCH_CONCURRENCY by default
+
+    Returns:
+        dict: Number of students, up to date, generated and failed
+    """
+    pack_size = max(1, pack_size or RECOMMENDATION_BATCH_PACK_SIZE)
+    semaphore = asyncio.Semaphore(max(1, concurrency or RECOMMENDATION_BATCH_CONCURRENCY))
+
+    async with AsyncSessionLocal() as db:
+        performances = await db.run_sync(get_class_global_performance, professeur_id)
+        versions = await db.run_sync(get_class_data_versions, professeur_id)
+        stored = {} if refresh else await db.run_sync(get_stored_versions, professeur_id)
+
+    pending = [
+        (eleve_id, info["nom_eleve"], info["email"], performance)
+        for eleve_id, (info, performance) in performances.items()
+        if refresh or stored.get(eleve_id) != versions.get(eleve_id)
+    ]
+    groups = [pending[i:i + pack_size] for i in range(0, len(pending), pack_size)]
+
+    async def run_group(students):
+        generated = await _generate(students, semaphore)
+        # Enregistré dès la fin du groupe : un arrêt en cours de lot garde le travail fait
+        async with AsyncSessionLocal() as db:
+            for eleve_id, recommendation in generated.items():
+                await db.run_sync(
+                    save_recommendation, professeur_id, eleve_id, GLOBAL_SCOPE,
+                    versions[eleve_id], recommendation,
+                )
+        return len(generated)
+
+    generated = sum(await asyncio.gather(*(run_group(students) for students in groups)))
+    return {
+        "students": len(performances),
+        "up_to_date": len(performances) - len(pending),
+        "generated": generated,
+        "failed": len(pending) - generated,
+    }
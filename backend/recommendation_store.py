@@ -0,0 +1,122 @@
+# recommendation_store.py
+"""
+Recommandations générées, conservées par (professeur, élève, exercice).
+
+Chaque recommandation garde la version des données de l'élève à partir
+desquelles elle a été produite : nombre et date de dernière écriture
+(date_maj) de ses réponses et de ses résultats. Tant que cette version ne
+bouge pas, /recommendations/student/{eleve_id} la relit sans appeler le LLM.
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import dialect_insert
+from models import Recommendation, StudentRecommendation
+
+# exercice_id des recommandations globales d'un élève
+GLOBAL_SCOPE = 0
+
+
+def get_data_version(db, professeur_id, eleve_id, exercice_id=None):
+    """
+    Version of the data a recommendation is built from: the student's
+    answers and results on one exercise, or on all the professor's exercises.
+
+    Returns:
+        str: Opaque version, changes with any insert or update of these rows
+    """
+    if exercice_id:
+        scope = "exercice_id = :exercice_id"
+    else:
+        scope = "exercice_id IN (SELECT id FROM exercices WHERE professeur_id = :prof_id)"
+    row = db.execute(text(f"""
+        SELECT s.total AS soumissions, s.maj AS soumissions_maj,
+               r.total AS resultats, r.maj AS resultats_maj
+        FROM (SELECT COUNT(*) AS total, MAX(date_maj) AS maj
+              FROM soumissions WHERE eleve_id = :eleve_id AND {scope}) s,
+             (SELECT COUNT(*) AS total, MAX(date_maj) AS maj
+              FROM resultats WHERE eleve_id = :eleve_id AND {scope}) r
+    """), {"eleve_id": eleve_id, "exercice_id": exercice_id, "prof_id": professeur_id}).fetchone()
+    return _format_version(row.soumissions, row.soumissions_maj, row.resultats, row.resultats_maj)
+
+
+def _format_version(soumissions, soumissions_maj, resultats, resultats_maj):
+    return f"s{soumissions}:{soumissions_maj}|r{resultats}:{resultats_maj}"
+
+
+def get_class_data_versions(db, professeur_id):
+    """
+    Global data version of every student of a professor, in two grouped
+    queries (same values as get_data_version without exercice_id).
+
+    Returns:
+        dict: {eleve_id: version}
+    """
+    params = {"prof_id": professeur_id}
+    scope = "exercice_id IN (SELECT id FROM exercices WHERE professeur_id = :prof_id)"
+    soumissions = db.execute(text(f"""
+        SELECT eleve_id, COUNT(*) AS total, MAX(date_maj) AS maj
+        FROM soumissions WHERE {scope}
+        GROUP BY eleve_id
+    """), params).fetchall()
+    resultats = {
+        row.eleve_id: row
+        for row in db.execute(text(f"""
+            SELECT eleve_id, COUNT(*) AS total, MAX(date_maj) AS maj
+            FROM resultats WHERE {scope}
+            GROUP BY eleve_id
+        """), params).fetchall()
+    }
+
+    versions = {}
+    for row in soumissions:
+        result = resultats.get(row.eleve_id)
+        versions[row.eleve_id] = _format_version(
+            row.total, row.maj, result.total if result else 0, result.maj if result else None
+        )
+    return versions
+
+
+def get_stored_versions(db, professeur_id):
+    """Data version of the stored global recommendations of a professor's students"""
+    rows = db.execute(text("""
+        SELECT eleve_id, data_version FROM recommendations
+        WHERE professeur_id = :prof_id AND exercice_id = :scope
+    """), {"prof_id": professeur_id, "scope": GLOBAL_SCOPE}).fetchall()
+    return {row.eleve_id: row.data_version for row in rows}
+
+
+def load_recommendation(db, professeur_id, eleve_id, exercice_id, data_version):
+    """Stored recommendation if it was built from data_version, else None"""
+    stored = db.get(StudentRecommendation, (professeur_id, eleve_id, exercice_id or GLOBAL_SCOPE))
+    if stored is None or stored.data_version != data_version:
+        return None
+    try:
+        return Recommendation.model_validate_json(stored.contenu)
+    except ValueError as e:
+        print(f"Stored recommendation ignored: {e}")
+        return None
+
+
+def save_recommendation(db, professeur_id, eleve_id, exercice_id, data_version, recommendation):
+    """Insert or replace the stored recommendation and commit"""
+    row = {
+        "professeur_id": professeur_id,
+        "eleve_id": eleve_id,
+        "exercice_id": exercice_id or GLOBAL_SCOPE,
+        "data_version": data_version,
+        "contenu": recommendation.model_dump_json(),
+        "date_generation": datetime.utcnow(),
+    }
+    stmt = dialect_insert(db, StudentRecommendation)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["professeur_id", "eleve_id", "exercice_id"],
+        set_={
+            "data_version": stmt.excluded.data_version,
+            "contenu": stmt.excluded.contenu,
+            "date_generation": stmt.excluded.date_generation,
+        },
+    )
+    db.execute(stmt, row)
+    db.commit()
@@ -8,26 +8,35 @@ import json
 import sqlite3  # used for test submission data
 
 from fastapi import (
+    BackgroundTasks,
     Depends,
     FastAPI,
     File,
     Form,
     HTTPException,
+    Query,
     Request,
+    Response,
     Security,
     UploadFile,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models import Programme
 from utils import (
     insert_qcm_data,
+    insert_qcm_exercises,
+    append_qcm_questions,
     extract_text_from_pdf_from_bytes,
     insert_submission_data,
     get_correct_answers_count,
@@ -37,27 +46,57 @@ from utils import (
     get_metrics,
     get_student_list,
     get_exercises_list,
+    count_students,
+    count_exercises,
     get_exercise_performance_data,
     get_student_global_performance,
     save_pdf_to_submission_folder,
+    record_submission_blob,
+    move_pdf_to_folder,
 )
-from database import SessionLocal, engine
+from database import SessionLocal, AsyncSessionLocal, async_engine, engine
+from blob_store import put_file
 from llm_agent import (
     invoke_llm,
-    invoke_generate_qcm_agent,
-    format_qcm_data,
+    astream_generate_qcm_agent,
+    aformat_qcm_data,
+    astream_format_qcm_data,
     invoke_analyze_student_copy_agent,
-    invoke_llm_recommendation_agent,
+    ainvoke_llm_recommendation_agent,
+    invalidate_curriculum_index,
+)
+from models import Base, Exercice, Professeur, Resultat, Soumission, Eleve, QCMExerciceSchema
+from llm_cache import llm_cache
+from dashboard_cache import dashboard_cache
+from pagination import MAX_PAGE_LIMIT
+from principal_cache import Principal, load_revocations, principal_cache, save_revocation
+from recommendation_store import get_data_version, load_recommendation, save_recommendation
+from recommendation_batch import precompute_class_recommendations
+from item_analysis import get_item_analysis
+from bulk_scoring import score_exercise_submissions
+from uploads import (
+    UploadTooLarge,
+    spool_upload,
+    expand_spooled_uploads,
+    discard as discard_upload,
+)
+from grading_jobs import (
+    JOB_DONE,
+    JOB_QUEUED,
+    grade_copies_batch,
+    new_job_id,
+    create_grading_job,
+    get_grading_job,
+    resume_pending_jobs,
 )
-from models import Base, Exercice, Professeur, Resultat, Soumission, Eleve
 from utils import (
     verify_exam_belongs_to_professor,
     verify_student_access,
     get_exam_results_for_professor,
-    get_pending_submissions,
+    count_exam_results,
     get_exams_for_professor,
-    add_missing_columns,
 )
+from migrations import run_migrations
 
 app = FastAPI()
 
@@ -67,13 +106,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # En-têtes de pagination lisibles par le frontend
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 # ======================================================
 # INITIAL SETUP
 # ======================================================
 Base.metadata.create_all(bind=engine)
-# add_missing_columns(engine)
+run_migrations(engine)
+
+
+@app.on_event("startup")
+def resume_grading_jobs():
+    # Jobs are stored in the database, pick up those interrupted by a restart
+    resumed = resume_pending_jobs()
+    if resumed:
+        print(f"Resumed {resumed} grading job(s)")
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    # Les connexions aiosqlite tournent dans des threads à fermer explicitement
+    await async_engine.dispose()
 
 # ----------------------------
 # CONFIGURATION JWT
@@ -117,6 +172,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    # Session asyncio pour les endpoints async : les requêtes ne bloquent pas la boucle
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # ----------------------------
 # RECUPERATION PROF PAR EMAIL
 # ----------------------------
@@ -223,6 +284,14 @@ async def parse_chatinput(request: Request) -> ChatInput:
     return ChatInput(**data)
 
 
+async def receive_upload(upload: UploadFile):
+    """Stream an uploaded PDF to disk, answering 413 above MAX_UPLOAD_BYTES"""
+    try:
+        return await spool_upload(upload)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
 # ======================================================
 # AUTHENTIFICATION
 # ======================================================
@@ -265,33 +334,70 @@ def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-def get_current_professeur(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-):
-    token = credentials.credentials
+def decode_access_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise HTTPException(
-                status_code=401, detail="Token invalide (sub manquant)."
-            )
-        prof = get_professeur_by_email(db, email)
-        if not prof:
-            raise HTTPException(status_code=401, detail="Utilisateur introuvable.")
-        return prof
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expiré.")
-    except jwt.JWTError:
+    except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Token invalide.")
 
 
+async def get_current_professeur(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+) -> Principal:
+    token = credentials.credentials
+    # Révocations faites par les autres workers, relues au plus toutes les quelques secondes
+    due, since = principal_cache.sync_since()
+    if due:
+        synced_at = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            revocations = await db.run_sync(load_revocations, since)
+        principal_cache.apply_revocations(revocations, synced_at)
+
+    # Jeton déjà vérifié : ni décodage ni requête en base
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+
+    payload = decode_access_token(token)
+    if principal_cache.is_revoked(token):
+        raise HTTPException(status_code=401, detail="Token révoqué.")
+    email: str = payload.get("sub")
+    if not email:
+        raise HTTPException(
+            status_code=401, detail="Token invalide (sub manquant)."
+        )
+    async with AsyncSessionLocal() as db:
+        prof = await db.scalar(
+            select(Professeur).where(Professeur.email == email).limit(1)
+        )
+    if not prof:
+        raise HTTPException(status_code=401, detail="Utilisateur introuvable.")
+
+    principal = Principal(id=prof.id, nom=prof.nom, email=prof.email)
+    principal_cache.set(token, principal, payload["exp"])
+    return principal
+
+
+@app.post("/logout/")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
+    """Revoke the current token, for every worker until it expires"""
+    payload = decode_access_token(credentials.credentials)
+    save_revocation(db, credentials.credentials, payload["exp"])
+    principal_cache.revoke_token(credentials.credentials, payload["exp"])
+    return {"message": "Déconnexion réussie"}
+
+
 # ======================================================
 # CRUD PROFESSEUR, EXERCICE, RESULTAT, etc.
 # ======================================================
 @app.get("/me/")
-def read_users_me(current_user: Professeur = Depends(get_current_professeur)):
+def read_users_me(current_user: Principal = Depends(get_current_professeur)):
     return {
         "id": current_user.id,
         "nom": current_user.nom,
@@ -303,62 +409,218 @@ def read_users_me(current_user: Professeur = Depends(get_current_professeur)):
 # ---------------- Submit Copy ----------------
 
 
-@app.post("/correct-exam/")
+@app.post("/correct-exam/", status_code=status.HTTP_202_ACCEPTED)
 async def submit_copy(
     pdf: UploadFile = File(...),
-    current_user: Professeur = Depends(get_current_professeur),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_professeur),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    pdf_bytes = await pdf.read()
-    text = extract_text_from_pdf_from_bytes(pdf_bytes)
-    structured_data = invoke_analyze_student_copy_agent(text)
-    print(structured_data, "structured_data")
-    has_inserted = insert_submission_data(structured_data, db)
-    print(has_inserted, "has_inserted")
-    if has_inserted:
-        print("Submission processed successfully")
-        # Get student and exercise IDs from structured data
-        id_eleve = structured_data.get("id_eleve")
-        id_exercice = structured_data.get("id_exercice")
-
-        # Get correct answers count and submission details
-        correct_count = get_correct_answers_count(
-            db, id_eleve=id_eleve, id_exercice=id_exercice
+    """
+    Queue a student copy for grading and return the job id immediately.
+    Progress and results are available on /correct-exam/jobs/{job_id}.
+    """
+    spooled = await receive_upload(pdf)
+    job_id = new_job_id()
+
+    def enqueue(session, copie_sha256, file_path, compressed):
+        record_submission_blob(session, copie_sha256, file_path, spooled.size, compressed)
+        return create_grading_job(
+            session, job_id, current_user.id, pdf.filename, file_path, copie_sha256
         )
-        print(correct_count, "correct_count")
-        submission_data = get_submission_data(db, id_eleve, id_exercice)
-        print(submission_data, "submission_data")
-        correct_answers = get_correct_answers(db, id_exercice)
-        print(correct_answers, "correct_answers")
 
-        return {
-            "message": "Submission processed successfully",
-            "data": structured_data,
-            "correct_count": correct_count,
-            "submission_data": submission_data,
-            "correct_answers": correct_answers,
-        }
-    else:
-        print("Submission failed")
-        return {"message": "Submission failed"}
+    try:
+        # Content-addressed storage: re-uploading a copy writes nothing new
+        copie_sha256, file_path, compressed, _ = await run_in_threadpool(
+            put_file, spooled.path, spooled.sha256
+        )
+        await db.run_sync(enqueue, copie_sha256, file_path, compressed)
+    except Exception as e:
+        discard_upload(spooled.path)
+        print(f"Error saving submission file: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save submission file")
+
+    return {
+        "job_id": job_id,
+        "status": JOB_QUEUED,
+        "status_url": f"/correct-exam/jobs/{job_id}",
+    }
+
+
+@app.post("/correct-exam/batch/")
+async def submit_copies_batch(
+    pdfs: List[UploadFile] = File(...),
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
+    """
+    Grade a whole class set in one request. Accepts several PDFs and/or zip
+    archives of PDFs and returns one outcome per copy.
+    """
+    spooled_files = []
+    try:
+        for upload in pdfs:
+            spooled_files.append(await receive_upload(upload))
+        copies = await run_in_threadpool(expand_spooled_uploads, spooled_files)
+    except UploadTooLarge as e:
+        for spooled in spooled_files:
+            discard_upload(spooled.path)
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        for spooled in spooled_files:
+            discard_upload(spooled.path)
+        raise
+    if not copies:
+        raise HTTPException(status_code=400, detail="No PDF copy found in upload")
+
+    try:
+        outcomes = await run_in_threadpool(grade_copies_batch, copies, db)
+    finally:
+        # Copies not moved into the store (failure or interruption)
+        for copy in copies:
+            discard_upload(copy.path)
+    succeeded = sum(1 for outcome in outcomes if outcome["status"] == JOB_DONE)
+    return {
+        "total": len(outcomes),
+        "succeeded": succeeded,
+        "failed": len(outcomes) - succeeded,
+        "results": outcomes,
+    }
+
+
+@app.get("/correct-exam/jobs/{job_id}")
+def get_correction_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
+    """Get progress and result of a grading job"""
+    job = get_grading_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 # -------------------- Chat Endpoint --------------------
+async def generate_qcm_incrementally(user_message, professeur_id, db):
+    """
+    Stream the QCM generation and save each valid question as soon as it is
+    parsed. Yields ("exercise", id) when the first question creates the
+    exercise, ("question", dict) for each saved question, then
+    ("end", parser) with the validated result.
+    """
+    header = {}
+    exercise_id = None
+    async for event, payload in astream_generate_qcm_agent(user_message, professeur_id, db):
+        if event == "header":
+            header = payload
+        elif event == "question":
+            if exercise_id is None:
+                exercise = {
+                    "titre": header.get("titre") or "QCM",
+                    "contenu": header.get("contenu") or "",
+                    "qcm": [payload],
+                }
+                exercise_ids = await db.run_sync(
+                    lambda session: insert_qcm_exercises([exercise], professeur_id, session)
+                )
+                if not exercise_ids:
+                    raise RuntimeError("Failed to save the generated exercise")
+                exercise_id = exercise_ids[0]
+                yield ("exercise", exercise_id)
+            elif not await db.run_sync(append_qcm_questions, exercise_id, [payload]):
+                continue
+            yield ("question", payload)
+        elif event == "end":
+            yield ("end", payload)
+
+
 @app.post("/chat/")
 async def chatbot(
     chat: ChatInput = Depends(parse_chatinput),
-    current_user: Professeur = Depends(get_current_professeur),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_professeur),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user_message = chat.message.lower()
 
     print(user_message)
-    response = invoke_generate_qcm_agent(user_message, current_user.id, db)
-    print(response)
-    print(current_user.id)
-    new_exercise = insert_qcm_data(response, current_user.id, db)
-    print(new_exercise)
-    return {"response": format_qcm_data(response, new_exercise)}
+    exercise_id = None
+    parser = None
+    async for event, payload in generate_qcm_incrementally(user_message, current_user.id, db):
+        if event == "exercise":
+            exercise_id = payload
+        elif event == "end":
+            parser = payload
+    if exercise_id is None:
+        raise HTTPException(
+            status_code=502, detail="The generation did not produce any valid question"
+        )
+    if not parser.complete or parser.invalid:
+        print(f"Partial exercise {exercise_id} kept: {len(parser.questions)} valid question(s)")
+
+    new_exercise = await db.get(Exercice, exercise_id)
+    return {"response": await aformat_qcm_data(parser.result(), new_exercise)}
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chatbot_stream(
+    chat: ChatInput = Depends(parse_chatinput),
+    current_user: Principal = Depends(get_current_professeur),
+):
+    """
+    Streaming variant of /chat/ (text/event-stream). Events, in order:
+    status (sent at once), exercise (id of the exercise, saved with its first
+    valid question), question (each question as soon as it is saved),
+    token (formatted text, repeated), then done, or error.
+    """
+    user_message = chat.message.lower()
+    professeur_id = current_user.id
+
+    async def events():
+        yield sse_event("status", {"stage": "generating"})
+        try:
+            exercise_id = None
+            parser = None
+            # Session propre au flux : elle doit vivre jusqu'au dernier événement
+            async with AsyncSessionLocal() as db:
+                async for event, payload in generate_qcm_incrementally(
+                    user_message, professeur_id, db
+                ):
+                    if event == "exercise":
+                        exercise_id = payload
+                        yield sse_event("exercise", {"exercise_id": exercise_id})
+                    elif event == "question":
+                        yield sse_event("question", payload)
+                    elif event == "end":
+                        parser = payload
+                new_exercise = await db.get(Exercice, exercise_id) if exercise_id else None
+            if new_exercise is None:
+                yield sse_event(
+                    "error", {"detail": "The generation did not produce any valid question"}
+                )
+                return
+
+            async for token in astream_format_qcm_data(parser.result(), new_exercise):
+                yield sse_event("token", {"text": token})
+            yield sse_event("done", {
+                "exercise_id": exercise_id,
+                "questions": len(parser.questions),
+                "partial": not parser.complete or parser.invalid > 0,
+            })
+        except Exception as e:
+            print(f"Error streaming chat response: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Pas de mise en tampon par un reverse proxy
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ----------------------------
@@ -370,13 +632,18 @@ async def chatbot(
 async def get_student_recommendations(
     eleve_id: int,
     exercice_id: Optional[int] = None,
-    current_user: Professeur = Depends(get_current_professeur),
-    db=Depends(get_db),
+    refresh: bool = False,
+    current_user: Principal = Depends(get_current_professeur),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Génère des recommandations pour un élève, soit global soit pour un exercice spécifique"""
+    """
+    Génère des recommandations pour un élève, soit global soit pour un exercice spécifique.
+    Les recommandations enregistrées sont resservies tant que les réponses et
+    résultats de l'élève n'ont pas changé ; refresh=true force une nouvelle génération.
+    """
 
     # Verify student access using utility function
-    if not verify_student_access(db, eleve_id, current_user.id):
+    if not await db.run_sync(verify_student_access, eleve_id, current_user.id):
         raise HTTPException(
             status_code=403, detail="You don't have access to this student's data"
         )
@@ -384,21 +651,34 @@ async def get_student_recommendations(
     # Get student and performance data using functions now in utils.py
     if exercice_id:
         # Verify the exercise belongs to this professor
-        if not verify_exam_belongs_to_professor(db, exercice_id, current_user.id):
+        if not await db.run_sync(
+            verify_exam_belongs_to_professor, exercice_id, current_user.id
+        ):
             raise HTTPException(
                 status_code=403, detail="You don't have access to this exercise"
             )
 
-        student_info, performance_str = get_exercise_performance_data(
-            db, eleve_id, exercice_id
+    data_version = await db.run_sync(
+        get_data_version, current_user.id, eleve_id, exercice_id
+    )
+    if not refresh:
+        stored = await db.run_sync(
+            load_recommendation, current_user.id, eleve_id, exercice_id, data_version
+        )
+        if stored:
+            return stored
+
+    if exercice_id:
+        student_info, performance_str = await db.run_sync(
+            get_exercise_performance_data, eleve_id, exercice_id
         )
         if not performance_str:
             raise HTTPException(
                 status_code=404, detail="No submissions found for this exercise"
             )
     else:
-        student_info, performance_str = get_student_global_performance(
-            db, eleve_id, current_user.id
+        student_info, performance_str = await db.run_sync(
+            get_student_global_performance, eleve_id, current_user.id
         )
         if not performance_str:
             raise HTTPException(
@@ -406,23 +686,51 @@ async def get_student_recommendations(
             )
 
     # Generate recommendations using the new function in llm_agent.py
-    result = invoke_llm_recommendation_agent(
+    result = await ainvoke_llm_recommendation_agent(
         student_info["nom_eleve"], student_info["email"], performance_str
     )
 
+    # Version lue avant la génération : une écriture pendant l'appel la fera régénérer
+    await db.run_sync(
+        save_recommendation, current_user.id, eleve_id, exercice_id, data_version, result
+    )
     return result
 
 
+@app.post("/recommendations/batch", status_code=status.HTTP_202_ACCEPTED)
+async def precompute_recommendations(
+    background_tasks: BackgroundTasks,
+    refresh: bool = False,
+    pack_size: Optional[int] = Query(None, ge=1, le=20),
+    wait: bool = False,
+    current_user: Principal = Depends(get_current_professeur),
+):
+    """
+    Précalcule les recommandations globales de tous les élèves du professeur.
+    Par défaut le lot tourne en arrière-plan ; wait=true attend la fin et
+    renvoie le bilan.
+    """
+    if wait:
+        return await precompute_class_recommendations(
+            current_user.id, refresh=refresh, pack_size=pack_size
+        )
+    background_tasks.add_task(
+        precompute_class_recommendations, current_user.id, refresh=refresh, pack_size=pack_size
+    )
+    return {"status": "queued"}
+
+
 @app.post("/save-result/")
 async def save_submission_result(
     exo_id: int = Form(...),
     eleve_id: int = Form(...),
     score: int = Form(...),
-    current_user: Professeur = Depends(get_current_professeur),
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """
-    Save the final score for a student's submission.
+    Save the final score for a student's submission. A score that differs
+    from the automatic one is no longer replaced by automatic scoring.
     """
     try:
         result_id = save_student_result(db, exo_id, eleve_id, score)
@@ -433,73 +741,210 @@ async def save_submission_result(
 
 @app.get("/metrics")
 def get_dashboard_metrics(
-    current_user: Professeur = Depends(get_current_professeur),
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """
     Get dashboard metrics for the current professor or all data if admin
     """
     # Assuming we want professor-specific data
-    metrics = get_metrics(db, professeur_id=current_user.id)
+    metrics = dashboard_cache.get_or_compute(
+        current_user.id, "metrics", lambda: get_metrics(db, professeur_id=current_user.id)
+    )
     return metrics
 
 
+def serve_list_page(response, professeur_id, endpoint, load_page, count,
+                    limit=None, cursor=None, fields=None, params=None):
+    """
+    Serve a page of a dashboard list through the cache. The whole list is
+    returned when no limit is given; X-Total-Count and X-Next-Cursor
+    headers describe the pagination.
+    """
+    params = params or {}
+    try:
+        items, next_cursor = dashboard_cache.get_or_compute(
+            professeur_id, endpoint, load_page,
+            params={**params, "limit": limit, "cursor": cursor, "fields": fields},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if limit or cursor:
+        # Même entrée de cache pour toutes les pages de la liste
+        total = dashboard_cache.get_or_compute(
+            professeur_id, endpoint, count, params={**params, "count": True}
+        )
+    else:
+        total = len(items)
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
 @app.get("/students")
 def get_students(
-    current_user: Professeur = Depends(get_current_professeur),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """
     Get list of students associated with exercises created by the current professor
     """
-    students = get_student_list(db, professeur_id=current_user.id)
-    return students
+    return serve_list_page(
+        response, current_user.id, "students",
+        lambda: get_student_list(
+            db, professeur_id=current_user.id, limit=limit, cursor=cursor, fields=fields
+        ),
+        lambda: count_students(db, professeur_id=current_user.id),
+        limit, cursor, fields,
+    )
 
 
 @app.get("/exercises")
 def get_exercises(
-    current_user: Professeur = Depends(get_current_professeur),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """
     Get list of exercises created by the current professor
+    (fields=id,titre skips the exercise contents)
+    """
+    return serve_list_page(
+        response, current_user.id, "exercises",
+        lambda: get_exercises_list(
+            db, professeur_id=current_user.id, limit=limit, cursor=cursor, fields=fields
+        ),
+        lambda: count_exercises(db, professeur_id=current_user.id),
+        limit, cursor, fields,
+    )
+
+
+@app.post("/exercises/bulk")
+def create_exercises_bulk(
+    exercises: List[QCMExerciceSchema],
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
     """
-    exercises = get_exercises_list(db, professeur_id=current_user.id)
-    return exercises
+    Insert several QCM exercises at once (generation runs, exercise bank imports)
+    """
+    exercise_ids = insert_qcm_exercises(
+        [exercise.model_dump() for exercise in exercises], current_user.id, db
+    )
+    if exercise_ids is None:
+        raise HTTPException(status_code=500, detail="Failed to insert exercises")
+    return {"created": len(exercise_ids), "exercise_ids": exercise_ids}
+
+
+@app.get("/exercises/{exercise_id}/item-analysis")
+def get_exercise_item_analysis(
+    exercise_id: int,
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
+    """
+    Difficulty, discrimination and answer distribution of each question of
+    an exercise, and its reliability (KR-20)
+    """
+    if not verify_exam_belongs_to_professor(db, exercise_id, current_user.id):
+        raise HTTPException(
+            status_code=403, detail="You don't have access to this exercise"
+        )
+    return get_item_analysis(db, exercise_id)
+
+
+@app.post("/exercises/{exercise_id}/score")
+def score_exercise(
+    exercise_id: int,
+    current_user: Principal = Depends(get_current_professeur),
+    db: Session = Depends(get_db),
+):
+    """
+    Score every submission of an exercise against its answer key and save
+    the result of each student. Scores edited with /save-result/ are kept.
+    """
+    if not verify_exam_belongs_to_professor(db, exercise_id, current_user.id):
+        raise HTTPException(
+            status_code=403, detail="You don't have access to this exercise"
+        )
+    try:
+        return {"exercise_id": exercise_id, **score_exercise_submissions(db, exercise_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @app.get("/exams")
 def get_exams(
-    current_user: Professeur = Depends(get_current_professeur),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """Get list of exercises formatted as exams for the dashboard"""
     # Use the utility function instead of inline query
-    exams = get_exams_for_professor(db, current_user.id)
-    return exams
+    return serve_list_page(
+        response, current_user.id, "exams",
+        lambda: get_exams_for_professor(
+            db, current_user.id, limit=limit, cursor=cursor, fields=fields
+        ),
+        lambda: count_exercises(db, professeur_id=current_user.id),
+        limit, cursor, fields,
+    )
 
 
 @app.get("/exam-results/{exam_id}")
 def get_exam_results(
     exam_id: int,
-    current_user: Professeur = Depends(get_current_professeur),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_professeur),
     db: Session = Depends(get_db),
 ):
     """Get all student results for a specific exam/exercise"""
-    # First verify the exam belongs to this professor using utility function
-    if not verify_exam_belongs_to_professor(db, exam_id, current_user.id):
-        raise HTTPException(
-            status_code=403, detail="You don't have access to this exam"
+
+    def load_results():
+        # First verify the exam belongs to this professor using utility function
+        # (a 403 is raised before anything is cached for this professor)
+        if not verify_exam_belongs_to_professor(db, exam_id, current_user.id):
+            raise HTTPException(
+                status_code=403, detail="You don't have access to this exam"
+            )
+
+        # Graded and pending students, in one query
+        return get_exam_results_for_professor(
+            db, exam_id, current_user.id, limit=limit, cursor=cursor, fields=fields
         )
 
-    # Get exam results using utility function
-    results = get_exam_results_for_professor(db, exam_id, current_user.id)
+    return serve_list_page(
+        response, current_user.id, "exam-results", load_results,
+        lambda: count_exam_results(db, exam_id, current_user.id),
+        limit, cursor, fields, params={"exam_id": exam_id},
+    )
+
+
+@app.get("/llm-cache/stats")
+def get_llm_cache_stats(current_user: Principal = Depends(get_current_professeur)):
+    """Hit/miss counters of the LLM response cache"""
+    return llm_cache.stats()
 
-    # If no results, check for pending submissions
-    if not results:
-        results = get_pending_submissions(db, exam_id)
 
-    return results
+@app.get("/dashboard-cache/stats")
+def get_dashboard_cache_stats(current_user: Principal = Depends(get_current_professeur)):
+    """Hit rate and staleness of the dashboard read cache"""
+    return dashboard_cache.stats()
 
 
 @app.post("/update_curriculum/")
@@ -507,15 +952,14 @@ async def update_curriculum(
     pdf: UploadFile = File(...),
     nom: str = Form(None),
     description: str = Form(None),
-    current_user: Professeur = Depends(get_current_professeur),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_professeur),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Upload a curriculum PDF file and save its details in the database
     """
+    spooled = await receive_upload(pdf)
     try:
-        pdf_bytes = await pdf.read()
-
         # Create program folder if it doesn't exist
         program_folder = "program"
         os.makedirs(program_folder, exist_ok=True)
@@ -525,35 +969,40 @@ async def update_curriculum(
             pdf.filename or f"curriculum_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         )
 
-        # Save the file using the existing utility function but specify program folder
-        file_path = save_pdf_to_submission_folder(
-            pdf_bytes, filename, submission_folder=program_folder
-        )
-
-        if not file_path:
-            raise HTTPException(
-                status_code=500, detail="Failed to save curriculum file"
-            )
-
         # Fix: Determine the name value before using it in the query
         programme_name = nom if nom else "Default Curriculum"
 
         # Create or update Programme record
         # First check if there's an existing record to update
-        existing_programme = (
-            db.query(Programme)
-            .filter(
+        existing_programme = await db.scalar(
+            select(Programme)
+            .where(
                 Programme.professeur_id == current_user.id,
                 Programme.nom == programme_name,
             )
-            .first()
+            .limit(1)
         )
 
+        # Forget the memoized hash of the file being replaced; the FAISS
+        # index itself is keyed by content and may be shared
+        if existing_programme:
+            invalidate_curriculum_index(existing_programme.file_path)
+
+        # Move the streamed upload into the program folder
+        file_path = await run_in_threadpool(
+            move_pdf_to_folder, spooled.path, filename, program_folder
+        )
+
+        if not file_path:
+            raise HTTPException(
+                status_code=500, detail="Failed to save curriculum file"
+            )
+
         if existing_programme:
             # Update existing record
             existing_programme.description = description or "Updated curriculum"
             existing_programme.file_path = file_path
-            db.commit()
+            await db.commit()
             programme_id = existing_programme.id
         else:
             # Create new record
@@ -565,8 +1014,8 @@ async def update_curriculum(
                 file_path=file_path,
             )
             db.add(new_programme)
-            db.commit()
-            db.refresh(new_programme)
+            await db.commit()
+            await db.refresh(new_programme)
             programme_id = new_programme.id
 
         return {
@@ -575,8 +1024,12 @@ async def update_curriculum(
             "file_path": file_path,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error uploading curriculum: {e}")
         raise HTTPException(
             status_code=500, detail=f"Failed to upload curriculum: {str(e)}"
         )
+    finally:
+        discard_upload(spooled.path)
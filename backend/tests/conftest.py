@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Les modules du backend sont importés à plat, comme depuis server.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Base SQLite jetable, définie avant le premier import de database
+_DB_DIR = tempfile.mkdtemp(prefix="eduia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("LLM_CACHE_MODE", "off")
+os.environ.setdefault("LLM_CACHE_BACKEND", "memory")
+os.environ.setdefault("DASHBOARD_CACHE_BACKEND", "memory")
+
+
+@pytest.fixture
+def db():
+    """Session on an empty database with the current schema"""
+    from answer_key import answer_key_cache
+    from dashboard_cache import dashboard_cache
+    from database import Base, SessionLocal, engine
+    import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    answer_key_cache.clear()
+    dashboard_cache.clear()
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,40 @@
+import glob
+import os
+
+import fitz
+import pytest
+
+from answer_sheet import parse_answer_sheet
+
+SUBMISSIONS = sorted(glob.glob(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "submissions", "*.pdf")
+))
+
+
+def _fitz_text(path):
+    # Même extraction que utils.extract_text_from_pdf_file
+    with fitz.open(path) as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+@pytest.mark.skipif(not SUBMISSIONS, reason="no stored copies")
+def test_parses_real_fitz_output():
+    results = [parse_answer_sheet(_fitz_text(path)) for path in SUBMISSIONS]
+
+    assert all(data is not None for data, _ in results)
+    # Quelques copies contiennent une réponse illisible ("1.8"), les autres sont complètes
+    assert sum(confidence == 1.0 for _, confidence in results) >= len(results) * 0.8
+
+
+def test_strips_invisible_format_characters():
+    text = (
+        "\u202dNom : Martin Dupont\u202c\n\u202dID Élève : 1\u202c\n"
+        "\u202dID Exercice : 5\u202c\n\u202dDate : 2025-03-24\u202c\n"
+        "\u202dRéponses :\u202c\n\u202d1.A\u202c\n\u202d2.C\u202c\n"
+    )
+    data, confidence = parse_answer_sheet(text)
+
+    assert confidence == 1.0
+    assert data["nom_eleve"] == "Martin Dupont"
+    assert data["id_eleve"] == 1 and data["id_exercice"] == 5
+    assert [(r["question"], r["reponse_choisie"]) for r in data["reponses"]] == [("Q1", "A"), ("Q2", "C")]
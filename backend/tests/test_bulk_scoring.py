@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from bulk_scoring import score_exercise_submissions
+from dashboard_rollups import get_rollup_totals, month_key
+from models import Professeur, Resultat
+from utils import insert_qcm_exercises, insert_submission_data, save_student_result
+
+ELEVE_ID = 1
+
+
+def _exercise(db):
+    """Professor and a two-question exercise whose correct answers are A then B"""
+    professeur = Professeur(nom="Prof", email="prof@example.com", mot_de_passe="x")
+    db.add(professeur)
+    db.commit()
+    qcm = [
+        {"id_qcm": 1, "question": "Q1", "reponses": [
+            {"lettre": "A", "texte": "oui", "est_correct": True},
+            {"lettre": "B", "texte": "non", "est_correct": False},
+        ]},
+        {"id_qcm": 2, "question": "Q2", "reponses": [
+            {"lettre": "A", "texte": "non", "est_correct": False},
+            {"lettre": "B", "texte": "oui", "est_correct": True},
+        ]},
+    ]
+    [exercise_id] = insert_qcm_exercises([{"titre": "QCM", "contenu": "", "qcm": qcm}], professeur.id, db)
+    return professeur.id, exercise_id
+
+
+def _submit(db, exercise_id, answers):
+    assert insert_submission_data({
+        "id_eleve": ELEVE_ID,
+        "id_exercice": exercise_id,
+        "nom_eleve": "Eleve",
+        "date_soumission": datetime.utcnow().strftime("%Y-%m-%d"),
+        "reponses": [
+            {"question": str(question), "reponse_choisie": answer}
+            for question, answer in enumerate(answers, start=1)
+        ],
+    }, db)
+
+
+def _result(db, exercise_id):
+    db.expire_all()
+    return db.query(Resultat).filter_by(exercice_id=exercise_id, eleve_id=ELEVE_ID).one()
+
+
+def _totals(db, professeur_id):
+    totals = get_rollup_totals(db, professeur_id, month_key(datetime.utcnow()))
+    return totals.score_sum, totals.result_count
+
+
+def test_creates_new_result(db):
+    professeur_id, exercise_id = _exercise(db)
+    _submit(db, exercise_id, ["a", " b "])
+
+    counts = score_exercise_submissions(db, exercise_id)
+
+    assert counts == {"created": 1, "updated": 0, "unchanged": 0, "manual": 0}
+    result = _result(db, exercise_id)
+    assert (result.score, result.score_auto) == (2, 2)
+    assert _totals(db, professeur_id) == (2, 1)
+
+
+def test_rescores_changed_automatic_score(db):
+    professeur_id, exercise_id = _exercise(db)
+    _submit(db, exercise_id, ["A", "B"])
+    score_exercise_submissions(db, exercise_id)
+
+    _submit(db, exercise_id, ["A", "A"])
+    counts = score_exercise_submissions(db, exercise_id)
+
+    assert counts == {"created": 0, "updated": 1, "unchanged": 0, "manual": 0}
+    result = _result(db, exercise_id)
+    assert (result.score, result.score_auto) == (1, 1)
+    assert _totals(db, professeur_id) == (1, 1)
+
+
+def test_leaves_unchanged_score_untouched(db):
+    professeur_id, exercise_id = _exercise(db)
+    _submit(db, exercise_id, ["A", "A"])
+    score_exercise_submissions(db, exercise_id)
+    date_maj = _result(db, exercise_id).date_maj
+
+    counts = score_exercise_submissions(db, exercise_id)
+
+    assert counts == {"created": 0, "updated": 0, "unchanged": 1, "manual": 0}
+    result = _result(db, exercise_id)
+    assert (result.score, result.score_auto, result.date_maj) == (1, 1, date_maj)
+    assert _totals(db, professeur_id) == (1, 1)
+
+
+def test_keeps_score_edited_by_hand(db):
+    professeur_id, exercise_id = _exercise(db)
+    _submit(db, exercise_id, ["A", "B"])
+    score_exercise_submissions(db, exercise_id)
+    save_student_result(db, exercise_id, ELEVE_ID, 10)
+
+    _submit(db, exercise_id, ["B", "A"])
+    counts = score_exercise_submissions(db, exercise_id)
+
+    assert counts == {"created": 0, "updated": 0, "unchanged": 0, "manual": 1}
+    result = _result(db, exercise_id)
+    assert (result.score, result.score_auto) == (10, 2)
+    assert _totals(db, professeur_id) == (10, 1)
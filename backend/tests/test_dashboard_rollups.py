@@ -0,0 +1,72 @@
+from sqlalchemy import text
+
+from bulk_scoring import score_exercise_submissions
+from dashboard_rollups import rebuild_dashboard_rollups
+from models import Professeur
+from utils import insert_qcm_exercises, insert_submissions_batch, save_student_result
+
+
+def _rollups(db):
+    return db.execute(text("""
+        SELECT professeur_id, mois, score_sum, result_count, copies_count
+        FROM dashboard_rollups
+        WHERE score_sum != 0 OR result_count != 0 OR copies_count != 0
+        ORDER BY professeur_id, mois
+    """)).fetchall()
+
+
+def _exercise(db, email):
+    professeur = Professeur(nom=email, email=email, mot_de_passe="x")
+    db.add(professeur)
+    db.commit()
+    qcm = [
+        {"id_qcm": code, "question": f"Q{code}", "reponses": [
+            {"lettre": "A", "texte": "oui", "est_correct": True},
+            {"lettre": "B", "texte": "non", "est_correct": False},
+        ]}
+        for code in (1, 2, 3)
+    ]
+    [exercise_id] = insert_qcm_exercises([{"titre": "QCM", "contenu": "", "qcm": qcm}], professeur.id, db)
+    return exercise_id
+
+
+def _copy(eleve_id, exercise_id, date_soumission, answers):
+    return {
+        "id_eleve": eleve_id,
+        "id_exercice": exercise_id,
+        "nom_eleve": f"Eleve {eleve_id}",
+        "date_soumission": date_soumission,
+        "reponses": [
+            {"question": str(question), "reponse_choisie": answer}
+            for question, answer in enumerate(answers, start=1)
+        ],
+    }
+
+
+def test_incremental_rollups_match_rebuild(db):
+    first = _exercise(db, "a@example.com")
+    second = _exercise(db, "b@example.com")
+
+    assert all(insert_submissions_batch([
+        _copy(1, first, "2026-01-10", ["A", "A", "B"]),
+        _copy(2, first, "2026-01-12", ["B", "B", "B"]),
+        _copy(1, second, "2026-02-03", ["A", "A", "A"]),
+    ], db))
+    score_exercise_submissions(db, first)
+    score_exercise_submissions(db, second)
+
+    # Nouvel envoi d'une copie déjà reçue, un mois plus tard : nouveau score,
+    # mais la copie reste comptée au mois de sa première soumission
+    assert all(insert_submissions_batch([_copy(1, first, "2026-03-01", ["A", "B", "B"])], db))
+    score_exercise_submissions(db, first, [1])
+    # Résultat modifié à la main, et un résultat saisi sans notation automatique
+    save_student_result(db, second, 1, 7)
+    save_student_result(db, second, 2, 4)
+
+    incremental = _rollups(db)
+    rebuild_dashboard_rollups(db)
+
+    assert incremental == _rollups(db)
+    assert sum(row.copies_count for row in incremental) == 3
+    assert sum(row.result_count for row in incremental) == 4
+    assert sum(row.score_sum for row in incremental) == 1 + 0 + 7 + 4
@@ -0,0 +1,121 @@
+from sqlalchemy import inspect, text
+
+from database import Base, create_db_engine
+from migrations import MIGRATIONS, run_migrations
+import models  # noqa: F401  (registers the tables)
+
+# Schéma créé par create_all avec les modèles du commit 42d46cc (baseline),
+# avant toute migration
+BASELINE_SCHEMA = [
+    """CREATE TABLE eleves (
+        id INTEGER NOT NULL PRIMARY KEY, nom VARCHAR, email VARCHAR, mot_de_passe VARCHAR
+    )""",
+    "CREATE INDEX ix_eleves_nom ON eleves (nom)",
+    "CREATE UNIQUE INDEX ix_eleves_email ON eleves (email)",
+    """CREATE TABLE professeurs (
+        id INTEGER NOT NULL PRIMARY KEY, nom VARCHAR, email VARCHAR, mot_de_passe VARCHAR
+    )""",
+    "CREATE UNIQUE INDEX ix_professeurs_email ON professeurs (email)",
+    """CREATE TABLE programmes (
+        id INTEGER NOT NULL PRIMARY KEY, nom VARCHAR, description VARCHAR,
+        professeur_id INTEGER REFERENCES professeurs (id)
+    )""",
+    """CREATE TABLE exercices (
+        id INTEGER NOT NULL PRIMARY KEY, titre VARCHAR, contenu VARCHAR,
+        professeur_id INTEGER REFERENCES professeurs (id),
+        programme_id INTEGER REFERENCES programmes (id)
+    )""",
+    """CREATE TABLE qcms (
+        id INTEGER NOT NULL PRIMARY KEY, exercice_qcm_id INTEGER, question VARCHAR,
+        exercice_id INTEGER REFERENCES exercices (id)
+    )""",
+    """CREATE TABLE qcm_reponses (
+        id INTEGER NOT NULL PRIMARY KEY, texte VARCHAR, est_correct BOOLEAN, lettre VARCHAR,
+        qcm_id INTEGER REFERENCES qcms (id)
+    )""",
+    """CREATE TABLE soumissions (
+        id INTEGER NOT NULL PRIMARY KEY, date_soumission DATETIME, question VARCHAR, answer VARCHAR,
+        eleve_id INTEGER REFERENCES eleves (id), exercice_id INTEGER REFERENCES exercices (id)
+    )""",
+    """CREATE TABLE resultats (
+        id INTEGER NOT NULL PRIMARY KEY, score INTEGER,
+        eleve_id INTEGER REFERENCES eleves (id), exercice_id INTEGER REFERENCES exercices (id)
+    )""",
+]
+
+SEED = [
+    "INSERT INTO professeurs (id, nom, email, mot_de_passe) VALUES (1, 'Prof', 'prof@example.com', 'x')",
+    "INSERT INTO exercices (id, titre, contenu, professeur_id) VALUES (1, 'QCM', '', 1)",
+    "INSERT INTO qcms (id, exercice_qcm_id, question, exercice_id) VALUES (1, 1, 'Q1', 1), (2, 2, 'Q2', 1)",
+    """INSERT INTO qcm_reponses (id, texte, est_correct, lettre, qcm_id)
+       VALUES (1, 'oui', 1, ' a ', 1), (2, 'non', 0, 'b', 1), (3, 'oui', 1, 'B', 2)""",
+    "INSERT INTO eleves (id, nom) VALUES (1, 'Eleve')",
+    # Question 1 soumise deux fois par l'ancien SELECT puis INSERT
+    """INSERT INTO soumissions (id, date_soumission, question, answer, eleve_id, exercice_id) VALUES
+       (1, '2025-11-05 10:00:00.000000', '1', 'b', 1, 1),
+       (2, '2025-11-06 10:00:00.000000', '1', ' a', 1, 1),
+       (3, '2025-11-04 10:00:00.000000', '2', 'b', 1, 1)""",
+    # Deux résultats pour le même couple
+    "INSERT INTO resultats (id, score, eleve_id, exercice_id) VALUES (1, 3, 1, 1), (2, 5, 1, 1)",
+]
+
+TABLES = [
+    "soumissions", "resultats", "qcms", "qcm_reponses", "copies", "dashboard_rollups", "schema_migrations",
+]
+
+
+def _snapshot(engine):
+    with engine.connect() as conn:
+        return {table: conn.execute(text(f"SELECT * FROM {table} ORDER BY 1")).fetchall() for table in TABLES}
+
+
+def test_migrates_baseline_database(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA + SEED:
+            conn.execute(text(statement))
+
+    # Même ordre qu'au démarrage du serveur : tables manquantes, puis migrations
+    Base.metadata.create_all(bind=engine)
+    assert run_migrations(engine) == sorted(version for version, _, _ in MIGRATIONS)
+
+    with engine.connect() as conn:
+        soumissions = conn.execute(text(
+            "SELECT id, code_question, code_reponse, date_maj, date_soumission FROM soumissions ORDER BY id"
+        )).fetchall()
+        resultats = conn.execute(text(
+            "SELECT id, score, score_auto, date_resultat, date_maj FROM resultats"
+        )).fetchall()
+        code_questions = conn.execute(text("SELECT code_question FROM qcms ORDER BY id")).scalars().all()
+        code_lettres = conn.execute(text("SELECT code_lettre FROM qcm_reponses ORDER BY id")).scalars().all()
+        copies = conn.execute(text(
+            "SELECT eleve_id, exercice_id, date_premiere_soumission FROM copies"
+        )).fetchall()
+        rollups = conn.execute(text(
+            "SELECT professeur_id, mois, score_sum, result_count, copies_count FROM dashboard_rollups"
+        )).fetchall()
+
+    # Doublons : la dernière réponse et le dernier résultat sont gardés
+    assert [(row.id, row.code_question, row.code_reponse) for row in soumissions] == [(2, "1", "A"), (3, "2", "B")]
+    assert all(row.date_maj == row.date_soumission for row in soumissions)
+    assert len(resultats) == 1
+    resultat = resultats[0]
+    assert (resultat.id, resultat.score, resultat.score_auto) == (2, 5, None)
+    assert str(resultat.date_resultat).startswith("2025-11-06")
+    assert resultat.date_maj == resultat.date_resultat
+
+    assert code_questions == ["1", "2"]
+    assert code_lettres == ["A", "B", "B"]
+    assert len(copies) == 1
+    assert (copies[0].eleve_id, copies[0].exercice_id) == (1, 1)
+    assert str(copies[0].date_premiere_soumission).startswith("2025-11-04")
+    assert [tuple(row) for row in rollups] == [(1, "2025-11", 5, 1, 1)]
+
+    indexes = {index["name"] for table in ("soumissions", "resultats") for index in inspect(engine).get_indexes(table)}
+    assert {"uq_soumissions_eleve_exercice_question", "uq_resultats_exercice_eleve"} <= indexes
+    assert "ix_resultats_exercice_eleve" not in indexes
+
+    # Seconde exécution : rien à appliquer, rien ne change
+    before = _snapshot(engine)
+    assert run_migrations(engine) == []
+    assert _snapshot(engine) == before
@@ -0,0 +1,128 @@
+# uploads.py
+"""
+Réception des PDF en streaming : le fichier est copié par blocs dans un
+fichier temporaire sur disque et haché au passage, sans jamais être chargé
+entièrement en mémoire. La taille maximale est vérifiée pendant la copie.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from collections import namedtuple
+
+from blob_store import SUBMISSION_STORE_DIR
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Dans le même système de fichiers que le stockage, pour un déplacement sans copie
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", os.path.join(SUBMISSION_STORE_DIR, "tmp"))
+
+SpooledUpload = namedtuple("SpooledUpload", ["filename", "path", "sha256", "size"])
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+
+def _new_temp_file():
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=UPLOAD_TMP_DIR, suffix=".part", delete=False)
+
+
+def _limit_error(filename, max_bytes):
+    return UploadTooLarge(f"{filename or 'upload'} exceeds the {max_bytes} bytes upload limit")
+
+
+async def spool_upload(upload, max_bytes=None):
+    """
+    Stream a FastAPI UploadFile to a temporary file, hashing it on the way.
+
+    Returns:
+        SpooledUpload: filename, temporary path, SHA-256 and size
+
+    Raises:
+        UploadTooLarge: If the upload is bigger than max_bytes
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    sha = hashlib.sha256()
+    size = 0
+    tmp = _new_temp_file()
+    try:
+        with tmp:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _limit_error(upload.filename, max_bytes)
+                sha.update(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        discard(tmp.name)
+        raise
+    return SpooledUpload(upload.filename, tmp.name, sha.hexdigest(), size)
+
+
+def spool_zip_members(spooled, max_bytes=None):
+    """
+    Stream every PDF of a spooled zip archive to its own temporary file.
+    The archive itself is deleted afterwards.
+
+    Returns:
+        list: SpooledUpload of each PDF member
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    members = []
+    try:
+        with zipfile.ZipFile(spooled.path) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/"):
+                    continue
+                if not name.lower().endswith(".pdf"):
+                    continue
+                if info.file_size > max_bytes:
+                    raise _limit_error(name, max_bytes)
+
+                sha = hashlib.sha256()
+                size = 0
+                tmp = _new_temp_file()
+                members.append(SpooledUpload(name, tmp.name, None, 0))
+                with tmp, archive.open(info) as src:
+                    for chunk in iter(lambda: src.read(UPLOAD_CHUNK_SIZE), b""):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise _limit_error(name, max_bytes)
+                        sha.update(chunk)
+                        tmp.write(chunk)
+                members[-1] = SpooledUpload(name, tmp.name, sha.hexdigest(), size)
+    except BaseException:
+        for member in members:
+            discard(member.path)
+        raise
+    finally:
+        discard(spooled.path)
+    return members
+
+
+def expand_spooled_uploads(spooled_files, max_bytes=None):
+    """Replace zip archives by the PDFs they contain"""
+    copies = []
+    try:
+        for index, spooled in enumerate(spooled_files):
+            if zipfile.is_zipfile(spooled.path):
+                copies.extend(spool_zip_members(spooled, max_bytes))
+            else:
+                copies.append(spooled)
+    except BaseException:
+        for leftover in copies + list(spooled_files[index + 1:]):
+            discard(leftover.path)
+        raise
+    return copies
+
+
+def discard(path):
+    """Remove a temporary file if it still exists"""
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -1,91 +1,186 @@
 import json
-import sqlite3
 from sqlalchemy.orm import Session
-from models import Exercice, QCM, QCMReponse, Eleve, Soumission, Resultat
+from models import Exercice, QCM, QCMReponse, Eleve, Soumission, Resultat, SubmissionBlob
+from database import dialect_insert
+from dashboard_rollups import record_new_copies, record_result_change, get_rollup_totals, month_key
+from dashboard_cache import dashboard_cache
+from pagination import decode_cursor, keyset_page, parse_fields
+from answer_key import answer_key_cache, normalize_code
+from blob_store import put_blob, put_file, read_blob, find_blob, hash_bytes
 import fitz  
 import os
+import shutil
 from datetime import datetime
-from sqlalchemy import text
-from sqlalchemy import inspect
-def insert_submission_data(data, db=None):
+from sqlalchemy import text, insert
+from sqlalchemy.exc import SQLAlchemyError
+def build_submission_rows(data, copie_sha256=None):
+    """
+    Validate a structured submission and turn it into rows for the eleves and soumissions tables.
+
+    Args:
+        data (dict): Structured data containing student information and responses
+        copie_sha256 (str, optional): Hash of the stored PDF copy
+
+    Returns:
+        tuple: (eleve_row, soumission_rows), or None if the submission is invalid
+    """
+    # Validate required fields
+    if not all(key in data for key in ["id_eleve", "id_exercice", "nom_eleve", "date_soumission", "reponses"]):
+        print("Error: Missing required fields in submission data")
+        return None
+
+    if not isinstance(data["reponses"], list) or len(data["reponses"]) == 0:
+        print("Error: No responses found in submission data")
+        return None
+
+    # Ensure date_soumission is a datetime object, not a string
+    if isinstance(data["date_soumission"], str):
+        try:
+            date_soumission = datetime.strptime(data["date_soumission"], '%Y-%m-%d')
+        except ValueError:
+            date_soumission = datetime.now()
+    else:
+        date_soumission = datetime.now()
+
+    # One row per question, the last answer given for a question wins
+    soumission_rows = {}
+    for reponse in data["reponses"]:
+        # Validate response data
+        if not all(key in reponse for key in ["question", "reponse_choisie"]):
+            print(f"Error: Invalid response format: {reponse}")
+            continue
+        soumission_rows[reponse["question"]] = {
+            "eleve_id": data["id_eleve"],
+            "exercice_id": data["id_exercice"],
+            "date_soumission": date_soumission,
+            "question": reponse["question"],
+            "answer": reponse["reponse_choisie"],
+            "code_question": normalize_code(reponse["question"]),
+            "code_reponse": normalize_code(reponse["reponse_choisie"]),
+            "copie_sha256": copie_sha256,
+        }
+
+    eleve_row = {"id": data["id_eleve"], "nom": data["nom_eleve"]}
+    return eleve_row, list(soumission_rows.values())
+
+
+def upsert_submission_rows(db, eleve_rows, soumission_rows):
+    """
+    Write submission rows with two set-based statements: students are inserted
+    if missing, answers are inserted or updated on (eleve_id, exercice_id, question).
+    """
+    if eleve_rows:
+        stmt = dialect_insert(db, Eleve).on_conflict_do_nothing(index_elements=["id"])
+        db.execute(stmt, eleve_rows)
+
+    if soumission_rows:
+        # Seules les nouvelles copies incrémentent le mois de leur première soumission
+        record_new_copies(db, soumission_rows)
+        stmt = dialect_insert(db, Soumission)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["eleve_id", "exercice_id", "question"],
+            set_={
+                "answer": stmt.excluded.answer,
+                "code_reponse": stmt.excluded.code_reponse,
+                "date_soumission": stmt.excluded.date_soumission,
+                "copie_sha256": stmt.excluded.copie_sha256,
+                "date_maj": stmt.excluded.date_maj,
+            },
+        )
+        db.execute(stmt, soumission_rows)
+
+
+def stage_submission_data(data, db, copie_sha256=None):
+    """
+    Validate a structured submission and write its rows without committing.
+
+    Args:
+        data (dict): Structured data containing student information and responses
+        db (Session): SQLAlchemy database session
+        copie_sha256 (str, optional): Hash of the stored PDF copy
+
+    Returns:
+        bool: True if the submission was staged, False if it is invalid
+    """
+    rows = build_submission_rows(data, copie_sha256)
+    if rows is None:
+        return False
+    eleve_row, soumission_rows = rows
+    upsert_submission_rows(db, [eleve_row], soumission_rows)
+    return True
+
+
+def insert_submission_data(data, db=None, copie_sha256=None):
     """
     Insert student submission data into the database using either SQLAlchemy or direct SQLite connection.
     
     Args:
         data (dict): Structured data containing student information and responses
         db (Session, optional): SQLAlchemy database session. If None, uses SQLite connection.
+        copie_sha256 (str, optional): Hash of the stored PDF copy
         
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        # Validate required fields
-        if not all(key in data for key in ["id_eleve", "id_exercice", "nom_eleve", "date_soumission", "reponses"]):
-            print("Error: Missing required fields in submission data")
-            return False
-            
-        if not isinstance(data["reponses"], list) or len(data["reponses"]) == 0:
-            print("Error: No responses found in submission data")
-            return False
-        
         if db:
-            # Use SQLAlchemy session
-            # Insert or get student
-            student = db.query(Eleve).filter(Eleve.id == data["id_eleve"]).first()
-            if not student:
-                student = Eleve(id=data["id_eleve"], nom=data["nom_eleve"])
-                db.add(student)
-                db.flush()
-            
-            # Ensure date_soumission is a datetime object, not a string
-            if isinstance(data["date_soumission"], str):
-                try:
-                    date_soumission = datetime.strptime(data["date_soumission"], '%Y-%m-%d')
-                except ValueError:
-                    date_soumission = datetime.now()
-            else:
-                date_soumission = datetime.now()
-            
-            # Insert responses
-            for reponse in data["reponses"]:
-                # Validate response data
-                if not all(key in reponse for key in ["question", "reponse_choisie"]):
-                    print(f"Error: Invalid response format: {reponse}")
-                    continue
-                
-                # Check if submission already exists
-                existing_submission = db.query(Soumission).filter(
-                    Soumission.eleve_id == data["id_eleve"],
-                    Soumission.exercice_id == data["id_exercice"],
-                    Soumission.question == reponse["question"]
-                ).first()
-                
-                if existing_submission:
-                    # Update existing submission with new answer
-                    existing_submission.answer = reponse["reponse_choisie"]
-                    existing_submission.date_soumission = date_soumission
-                else:
-                    # Create new submission
-                    new_submission = Soumission(
-                        eleve_id=data["id_eleve"],
-                        exercice_id=data["id_exercice"],
-                        date_soumission=date_soumission,
-                        question=reponse["question"],
-                        answer=reponse["reponse_choisie"]
-                    )
-                    db.add(new_submission)
-            
+            if not stage_submission_data(data, db, copie_sha256):
+                return False
             db.commit()
+            dashboard_cache.invalidate_exercises(db, [data["id_exercice"]], "submissions")
             return True
         
-    except sqlite3.Error as e:
+    except SQLAlchemyError as e:
         print(f"Database error: {e}")
+        db.rollback()
         return False
     except Exception as e:
         print(f"Unexpected error while inserting submission data: {e}")
+        db.rollback()
         return False
 
 
+def insert_submissions_batch(submissions, db, copie_hashes=None):
+    """
+    Insert several structured submissions in a single transaction.
+
+    Args:
+        submissions (list): Structured data dicts, one per student copy
+        db (Session): SQLAlchemy database session
+        copie_hashes (list, optional): Hash of the stored PDF of each copy
+
+    Returns:
+        list: One bool per submission, True if it was inserted
+    """
+    inserted = []
+    eleve_rows = {}
+    soumission_rows = {}
+    try:
+        copie_hashes = copie_hashes or [None] * len(submissions)
+        for data, copie_sha256 in zip(submissions, copie_hashes):
+            rows = build_submission_rows(data, copie_sha256)
+            inserted.append(rows is not None)
+            if rows is None:
+                continue
+            eleve_row, copy_rows = rows
+            eleve_rows.setdefault(eleve_row["id"], eleve_row)
+            # Two copies of the same student answer: the later one wins
+            for row in copy_rows:
+                key = (row["eleve_id"], row["exercice_id"], row["question"])
+                soumission_rows[key] = row
+
+        upsert_submission_rows(db, list(eleve_rows.values()), list(soumission_rows.values()))
+        db.commit()
+        dashboard_cache.invalidate_exercises(
+            db, [exercice_id for _, exercice_id, _ in soumission_rows], "submissions"
+        )
+        return inserted
+    except Exception as e:
+        print(f"Error while inserting submission batch: {e}")
+        db.rollback()
+        return [False] * len(submissions)
+
+
 def save_pdf_to_submission_folder(pdf_bytes: bytes, filename: str, submission_folder: str = "submissions") -> str:
     """
     Save a PDF file to the submission folder with a valid filename
@@ -121,20 +216,50 @@ def save_pdf_to_submission_folder(pdf_bytes: bytes, filename: str, submission_fo
         return ""
 
 
+def move_pdf_to_folder(src_path: str, filename: str, folder: str) -> str:
+    """
+    Move an uploaded temporary PDF into a folder with a valid filename
+
+    Returns:
+        str: The path to the moved PDF file, or an empty string on failure
+    """
+    try:
+        os.makedirs(folder, exist_ok=True)
+        sanitized_filename = filename.replace(":", "-").replace(" ", "_")
+        if not sanitized_filename.lower().endswith('.pdf'):
+            sanitized_filename += '.pdf'
+        file_path = os.path.join(folder, sanitized_filename)
+        shutil.move(src_path, file_path)
+        return file_path
+    except Exception as e:
+        print(f"Error moving PDF file: {e}")
+        return ""
+
+
+def extract_text_from_pdf_file(file_path: str) -> str:
+    """
+    Extract the text of a PDF already stored on disk
+    """
+    try:
+        with fitz.open(file_path) as doc:
+            return "\n".join(page.get_text() for page in doc)
+    except Exception as e:
+        print(f"Error extracting text from PDF {file_path}: {e}")
+        return ""
+
+
 def extract_text_from_pdf_from_bytes(pdf_bytes: bytes) -> str:
+    """
+    Extract the text of a PDF and keep the file in the content-addressed
+    submission store (the write is skipped if the same bytes are already stored)
+    """
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         text = "\n".join(page.get_text() for page in doc)
         
-        # Save the PDF file with a proper filename
-        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        file_path = save_pdf_to_submission_folder(
-            pdf_bytes, 
-            f"submission_{timestamp}.pdf", 
-            submission_folder="submissions"
-        )
-        
-        if file_path:
+        # Save the PDF file under the hash of its content
+        _, file_path, _, created = put_blob(pdf_bytes)
+        if created:
             print(f"PDF saved to: {file_path}")
         
         return text
@@ -142,26 +267,96 @@ def extract_text_from_pdf_from_bytes(pdf_bytes: bytes) -> str:
         print(f"Error extracting text from PDF: {e}")
         return ""
 
+
+def get_submission_blobs(db, hashes):
+    """Return the stored copies among the given hashes, as a dict keyed by hash"""
+    if not hashes:
+        return {}
+    blobs = db.query(SubmissionBlob).filter(SubmissionBlob.sha256.in_(set(hashes))).all()
+    return {blob.sha256: blob for blob in blobs}
+
+
+def record_submission_blob(db, sha256, file_path, size, compressed, texte_extrait=None):
+    """Add or update the row describing a stored copy, without committing"""
+    blob = db.get(SubmissionBlob, sha256)
+    if not blob:
+        blob = SubmissionBlob(sha256=sha256)
+        db.add(blob)
+    blob.file_path = file_path
+    blob.taille = size
+    blob.compresse = compressed
+    if texte_extrait:
+        blob.texte_extrait = texte_extrait
+    return blob
+
+
+def store_submission_file(db, spooled):
+    """
+    Move a spooled upload into the submission store and record it in the database.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        spooled (SpooledUpload): Upload already hashed on a temporary file
+
+    Returns:
+        tuple: (sha256, file_path)
+    """
+    sha256, file_path, compressed, _ = put_file(spooled.path, spooled.sha256)
+    record_submission_blob(db, sha256, file_path, spooled.size, compressed)
+    db.commit()
+    return sha256, file_path
+
+
+def extract_text_from_stored_copy(sha256: str) -> str:
+    """
+    Extract the text of a copy of the submission store. Uncompressed copies
+    are opened by fitz straight from their path.
+    """
+    file_path, compressed = find_blob(sha256)
+    if not file_path:
+        print(f"Stored copy {sha256} not found")
+        return ""
+    if not compressed:
+        return extract_text_from_pdf_file(file_path)
+    try:
+        with fitz.open(stream=read_blob(sha256), filetype="pdf") as doc:
+            return "\n".join(page.get_text() for page in doc)
+    except Exception as e:
+        print(f"Error extracting text from PDF {sha256}: {e}")
+        return ""
+
+
+def load_submission_text(db, sha256):
+    """
+    Return the extracted text of a stored copy. The text is extracted only
+    the first time and then served from the database.
+    """
+    blob = db.get(SubmissionBlob, sha256)
+    if blob and blob.texte_extrait:
+        return blob.texte_extrait
+
+    text = extract_text_from_stored_copy(sha256)
+
+    if blob and text:
+        blob.texte_extrait = text
+        db.commit()
+    return text
+
 def get_correct_answers_count(db, id_eleve, id_exercice):
     """
     Count correct answers for a student's submission on a specific exercise
-    with a direct letter mapping
+    against the cached answer key of the exercise
     """
     if not id_eleve or not id_exercice:
         return 0
-        
-    query = text("""
-        SELECT COUNT(*)
-        FROM soumissions s
-        JOIN qcms q ON LOWER(s.question) = LOWER(q.exercice_qcm_id) AND q.exercice_id = s.exercice_id
-        JOIN qcm_reponses r ON r.qcm_id = q.id AND LOWER(r.lettre) = LOWER(s.answer)
-        WHERE s.eleve_id = :id_eleve 
-          AND s.exercice_id = :id_exercice 
-          AND r.est_correct = 1
-    """)
-    
-    result = db.execute(query, {"id_eleve": id_eleve, "id_exercice": id_exercice}).scalar()
-    return result if result else 0
+
+    answer_key = answer_key_cache.get(db, id_exercice)
+    answers = db.execute(text("""
+        SELECT code_question, code_reponse
+        FROM soumissions
+        WHERE eleve_id = :id_eleve AND exercice_id = :id_exercice
+    """), {"id_eleve": id_eleve, "id_exercice": id_exercice}).fetchall()
+    return answer_key.score(answers)
 
 def get_submission_data(db, student_id, exercise_id):
     """
@@ -201,39 +396,146 @@ def get_submission_data(db, student_id, exercise_id):
 
 def get_correct_answers(db, exercise_id):
     """
-    Get the correct answers for a specific exercise
+    Get the correct answers for a specific exercise, from its cached answer key
     """
     if not exercise_id:
         return []
-        
-    query = text("""
-        SELECT 
-            q.exercice_qcm_id,
-            q.question,
-            r.texte AS correct_answer,
-            r.lettre
-        FROM 
-            qcms q
-        JOIN 
-            qcm_reponses r ON q.id = r.qcm_id
-        WHERE 
-            q.exercice_id = :exercise_id
-            AND r.est_correct = 1
-    """)
-    
-    results = db.execute(query, {"exercise_id": exercise_id}).fetchall()
-    
-    # Convert to list of dictionaries for JSON serialization
-    correct_answers = []
-    for row in results:
-        correct_answers.append({
+    return answer_key_cache.get(db, exercise_id).correct_answers()
+
+
+def get_qcm_exercise(db, exercise_id):
+    """
+    Load an exercise with its questions and answers in the structure produced
+    by the generation model (titre, contenu, qcm), or None if it does not exist.
+    """
+    exercise = db.get(Exercice, exercise_id)
+    if not exercise:
+        return None
+
+    rows = db.execute(text("""
+        SELECT q.id, q.exercice_qcm_id, q.question, r.texte, r.est_correct, r.lettre
+        FROM qcms q
+        LEFT JOIN qcm_reponses r ON r.qcm_id = q.id
+        WHERE q.exercice_id = :exercise_id
+        ORDER BY q.id, r.lettre
+    """), {"exercise_id": exercise_id}).fetchall()
+
+    questions = {}
+    for row in rows:
+        question = questions.setdefault(row.id, {
             "id_qcm": row.exercice_qcm_id,
             "question": row.question,
-            "correct_answer": row.correct_answer,
-            "lettre": row.lettre
+            "reponses": [],
         })
-    
-    return correct_answers
+        if row.lettre is not None:
+            question["reponses"].append({
+                "texte": row.texte,
+                "est_correct": bool(row.est_correct),
+                "lettre": row.lettre,
+            })
+
+    return {
+        "titre": exercise.titre,
+        "contenu": exercise.contenu,
+        "qcm": list(questions.values()),
+    }
+
+
+def insert_qcm_questions(db, questions_by_exercise):
+    """
+    Insert the questions and answers of one or more exercises with two bulk statements.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        questions_by_exercise (list): (exercice_id, list of question dicts) tuples
+    """
+    questions = [
+        (exercice_id, q) for exercice_id, exercise_questions in questions_by_exercise
+        for q in exercise_questions
+    ]
+    if not questions:
+        return
+
+    # RETURNING gives back the new ids in the order of the rows
+    qcm_ids = db.scalars(
+        insert(QCM).returning(QCM.id, sort_by_parameter_order=True),
+        [
+            {
+                "question": q["question"],
+                "exercice_id": exercice_id,
+                "exercice_qcm_id": q["id_qcm"],
+                "code_question": normalize_code(q["id_qcm"]),
+            }
+            for exercice_id, q in questions
+        ],
+    ).all()
+
+    reponse_rows = [
+        {
+            "texte": rep["texte"],
+            "est_correct": rep["est_correct"],
+            "lettre": rep["lettre"],
+            "code_lettre": normalize_code(rep["lettre"]),
+            "qcm_id": qcm_id,
+        }
+        for qcm_id, (_, q) in zip(qcm_ids, questions)
+        for rep in q["reponses"]
+    ]
+    if reponse_rows:
+        db.execute(insert(QCMReponse), reponse_rows)
+
+
+def insert_qcm_exercises(qcm_list, professeur_id, db):
+    """
+    Insert several generated or imported exercises in a constant number of statements.
+
+    Args:
+        qcm_list (list): QCM dicts (titre, contenu, qcm) as produced by the generation model
+        professeur_id: ID of the professor owning the exercises
+        db (Session): SQLAlchemy database session
+
+    Returns:
+        list: IDs of the created exercises, in input order, or None if an error occurred
+    """
+    if not qcm_list:
+        return []
+    try:
+        exercise_ids = db.scalars(
+            insert(Exercice).returning(Exercice.id, sort_by_parameter_order=True),
+            [
+                {"titre": qcm_data["titre"], "contenu": qcm_data["contenu"], "professeur_id": professeur_id}
+                for qcm_data in qcm_list
+            ],
+        ).all()
+        insert_qcm_questions(
+            db, [(exercise_id, qcm_data["qcm"]) for exercise_id, qcm_data in zip(exercise_ids, qcm_list)]
+        )
+        db.commit()
+        dashboard_cache.invalidate(professeur_id, "exercises")
+        return list(exercise_ids)
+    except Exception as e:
+        db.rollback()
+        print(f"Error inserting QCM data: {e}")
+        return None
+
+
+def append_qcm_questions(db, exercise_id, questions):
+    """
+    Add questions to an existing exercise and commit, used to save a
+    streamed generation question by question.
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        insert_qcm_questions(db, [(exercise_id, questions)])
+        db.commit()
+        answer_key_cache.invalidate(exercise_id)
+        return True
+    except Exception as e:
+        print(f"Error inserting QCM questions: {e}")
+        db.rollback()
+        return False
 
 
 def insert_qcm_data(qcm_data, professeur_id, db=None):
@@ -257,44 +559,10 @@ def insert_qcm_data(qcm_data, professeur_id, db=None):
             return None
     
     if db:
-        try:
-            # Use SQLAlchemy session
-            # Create new exercise
-            new_exercise = Exercice(
-                titre=qcm_data["titre"],
-                contenu=qcm_data["contenu"],
-                professeur_id=professeur_id  # Default professor ID
-            )
-            db.add(new_exercise)
-            db.flush()  # Get the ID without committing
-            
-            # Create QCM questions
-            for q in qcm_data["qcm"]:
-                new_qcm = QCM(
-                    question=q["question"],
-                    exercice_id=new_exercise.id,
-                    
-                    exercice_qcm_id=q["id_qcm"]
-                )
-                db.add(new_qcm)
-                db.flush()
-                
-                # Create answers for each question
-                for rep in q["reponses"]:
-                    new_reponse = QCMReponse(
-                        texte=rep["texte"],
-                        est_correct=rep["est_correct"],
-                        lettre=rep["lettre"],
-                        qcm_id=new_qcm.id
-                    )
-                    db.add(new_reponse)
-            
-            db.commit()
-            return new_exercise
-        except Exception as e:
-            db.rollback()
-            print(f"Error inserting QCM data: {e}")
+        exercise_ids = insert_qcm_exercises([qcm_data], professeur_id, db)
+        if not exercise_ids:
             return None
+        return db.get(Exercice, exercise_ids[0])
     else:
         print("Error: No database session provided")
         return None
@@ -332,8 +600,13 @@ def save_student_result(db, exo_id, eleve_id, score):
     
     if existing_result:
         # Update existing result
+        record_result_change(
+            db, exercice.professeur_id, existing_result.date_resultat,
+            score - (existing_result.score or 0), 0,
+        )
         existing_result.score = score
         db.commit()
+        dashboard_cache.invalidate(exercice.professeur_id, "results")
         db.refresh(existing_result)
         return existing_result.id
     else:
@@ -341,11 +614,14 @@ def save_student_result(db, exo_id, eleve_id, score):
         new_result = Resultat(
             score=score,
             exercice_id=exo_id,
-            eleve_id=eleve_id
+            eleve_id=eleve_id,
+            date_resultat=datetime.utcnow()
         )
         
         db.add(new_result)
+        record_result_change(db, exercice.professeur_id, new_result.date_resultat, score, 1)
         db.commit()
+        dashboard_cache.invalidate(exercice.professeur_id, "results")
         db.refresh(new_result)
         return new_result.id
 
@@ -355,67 +631,24 @@ def get_metrics(db, professeur_id=None):
     - Average score across all results
     - Total exams corrected
     - Score change compared to previous month
+    - Copies received this month
+
+    Read from the dashboard_rollups aggregates, one indexed row per month.
     """
-    from datetime import datetime, timedelta
-    from sqlalchemy import text, func
-    
-    # Define time periods for comparisons
-    now = datetime.utcnow()
-    current_month_start = datetime(now.year, now.month, 1)
-    previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-    
-    # Base query to get all results if no professor_id specified
-    if professeur_id:
-        # For a specific professor, only count exams they created
-        base_query = text("""
-            SELECT r.id, r.score, ex.id, ex.professeur_id
-            FROM resultats r
-            JOIN exercices ex ON r.exercice_id = ex.id
-            WHERE ex.professeur_id = :prof_id
-        """)
-        params = {"prof_id": professeur_id}
-    else:
-        # For all results
-        base_query = text("""
-            SELECT r.id, r.score
-            FROM resultats r
-        """)
-        params = {}
-    
-    # Get current average
-    results = db.execute(base_query, params).fetchall()
-    total_exams = len(results)
-    
+    current_month = month_key(datetime.utcnow())
+    totals = get_rollup_totals(db, professeur_id, current_month)
+
+    total_exams = totals.result_count
     if total_exams > 0:
-        avg_score = sum(r.score for r in results) / total_exams
+        avg_score = totals.score_sum / total_exams
     else:
         avg_score = 0
-    
-    # Get previous month data
-    if professeur_id:
-        prev_month_query = text("""
-            SELECT AVG(r.score) as avg_score, COUNT(r.id) as count
-            FROM resultats r
-            JOIN exercices ex ON r.exercice_id = ex.id
-            JOIN soumissions s ON r.exercice_id = s.exercice_id
-            WHERE ex.professeur_id = :prof_id
-            AND s.date_soumission < :cutoff_date
-        """)
-        prev_params = {"prof_id": professeur_id, "cutoff_date": current_month_start}
-    else:
-        prev_month_query = text("""
-            SELECT AVG(r.score) as avg_score, COUNT(r.id) as count
-            FROM resultats r
-            JOIN soumissions s ON r.exercice_id = s.exercice_id
-            WHERE s.date_soumission < :cutoff_date
-        """)
-        prev_params = {"cutoff_date": current_month_start}
-    
-    prev_result = db.execute(prev_month_query, prev_params).fetchone()
-    
-    if prev_result and prev_result.avg_score:
-        score_change = round(avg_score - prev_result.avg_score, 1)
-        exams_trend = total_exams - prev_result.count
+
+    # Previous months only, compared to all results
+    if totals.prev_count > 0:
+        prev_avg_score = totals.prev_score_sum / totals.prev_count
+        score_change = round(avg_score - prev_avg_score, 1)
+        exams_trend = total_exams - totals.prev_count
     else:
         score_change = 0
         exams_trend = total_exams
@@ -424,58 +657,137 @@ def get_metrics(db, professeur_id=None):
         "averageScore": round(avg_score, 1),
         "examsCorrected": total_exams,
         "scoreChange": score_change,
-        "examsTrend": exams_trend
+        "examsTrend": exams_trend,
+        "copiesThisMonth": totals.copies_this_month
     }
 
-def get_student_list(db, professeur_id=None):
-    """Get list of students, optionally filtered by professor relation"""
-    from sqlalchemy import text
-    
+STUDENT_FIELDS = ("id", "nom", "email")
+EXERCISE_FIELDS = ("id", "titre", "contenu")
+EXAM_FIELDS = ("id", "name")
+EXAM_RESULT_FIELDS = ("student", "score", "submission_date", "status")
+
+
+def _project(row, fields):
+    return {field: getattr(row, field) for field in fields}
+
+
+def _limit_clause(limit, params):
+    # One extra row tells whether a next page exists
+    if not limit:
+        return ""
+    params["limit"] = limit + 1
+    return "LIMIT :limit"
+
+
+def get_student_list(db, professeur_id=None, limit=None, cursor=None, fields=None):
+    """
+    Get list of students, optionally filtered by professor relation.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        professeur_id (int, optional): Only students who submitted to this professor's exercises
+        limit (int, optional): Page size, all students if None
+        cursor (str, optional): Cursor of the previous page
+        fields (str, optional): Comma separated fields to return (id, nom, email)
+
+    Returns:
+        tuple: (list of students, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor or the fields are invalid
+    """
+    fields = parse_fields(fields, STUDENT_FIELDS)
+    after = decode_cursor(cursor, 3)
+    conditions = []
+    params = {}
+
     if professeur_id:
         # Get students who have submitted to exercises by this professor
-        query = text("""
-            SELECT DISTINCT e.id, e.nom, e.email
-            FROM eleves e
-            JOIN soumissions s ON e.id = s.eleve_id
+        conditions.append("""EXISTS (
+            SELECT 1 FROM soumissions s
             JOIN exercices ex ON s.exercice_id = ex.id
-            WHERE ex.professeur_id = :prof_id
-            ORDER BY e.nom, e.email
-        """)
-        params = {"prof_id": professeur_id}
-    else:
-        # Get all students
-        query = text("""
-            SELECT id, nom, email
-            FROM eleves
-            ORDER BY nom, email
-        """)
-        params = {}
-    
+            WHERE s.eleve_id = e.id AND ex.professeur_id = :prof_id
+        )""")
+        params["prof_id"] = professeur_id
+    if after:
+        conditions.append("(COALESCE(e.nom, ''), COALESCE(e.email, ''), e.id) > (:after_nom, :after_email, :after_id)")
+        params.update(after_nom=after[0], after_email=after[1], after_id=after[2])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit_clause = _limit_clause(limit, params)
+    query = text(f"""
+        SELECT e.id, e.nom, e.email
+        FROM eleves e
+        {where}
+        ORDER BY COALESCE(e.nom, ''), COALESCE(e.email, ''), e.id
+        {limit_clause}
+    """)
+
     students = db.execute(query, params).fetchall()
-    return [{"id": s.id, "nom": s.nom, "email": s.email} for s in students]
+    students, next_cursor = keyset_page(
+        students, limit, lambda s: (s.nom or "", s.email or "", s.id)
+    )
+    return [_project(s, fields) for s in students], next_cursor
 
-def get_exercises_list(db, professeur_id=None):
-    """Get list of exercises, optionally filtered by professor"""
-    from sqlalchemy import text
-    
+
+def count_students(db, professeur_id=None):
+    """Number of students returned by get_student_list"""
     if professeur_id:
-        query = text("""
-            SELECT id, titre, contenu
-            FROM exercices
-            WHERE professeur_id = :prof_id
-            ORDER BY id DESC
-        """)
-        params = {"prof_id": professeur_id}
-    else:
-        query = text("""
-            SELECT id, titre, contenu
-            FROM exercices
-            ORDER BY id DESC
-        """)
-        params = {}
-    
+        return db.execute(text("""
+            SELECT COUNT(DISTINCT s.eleve_id)
+            FROM soumissions s
+            JOIN exercices ex ON s.exercice_id = ex.id
+            JOIN eleves e ON e.id = s.eleve_id
+            WHERE ex.professeur_id = :prof_id
+        """), {"prof_id": professeur_id}).scalar()
+    return db.execute(text("SELECT COUNT(*) FROM eleves")).scalar()
+
+
+def get_exercises_list(db, professeur_id=None, limit=None, cursor=None, fields=None):
+    """
+    Get list of exercises, optionally filtered by professor, newest first.
+    The contenu column is only read when requested in fields.
+
+    Returns:
+        tuple: (list of exercises, next cursor or None)
+    """
+    fields = parse_fields(fields, EXERCISE_FIELDS)
+    after = decode_cursor(cursor, 1)
+    conditions = []
+    params = {}
+
+    if professeur_id:
+        conditions.append("professeur_id = :prof_id")
+        params["prof_id"] = professeur_id
+    if after:
+        conditions.append("id < :after_id")
+        params["after_id"] = after[0]
+
+    # id is the sort key, always read
+    columns = ", ".join(dict.fromkeys(("id",) + fields))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit_clause = _limit_clause(limit, params)
+    query = text(f"""
+        SELECT {columns}
+        FROM exercices
+        {where}
+        ORDER BY id DESC
+        {limit_clause}
+    """)
+
     exercises = db.execute(query, params).fetchall()
-    return [{"id": ex.id, "titre": ex.titre, "contenu": ex.contenu} for ex in exercises]
+    exercises, next_cursor = keyset_page(exercises, limit, lambda ex: (ex.id,))
+    return [_project(ex, fields) for ex in exercises], next_cursor
+
+
+def count_exercises(db, professeur_id=None):
+    """Number of exercises of a professor, or of all professors"""
+    if professeur_id:
+        return db.execute(
+            text("SELECT COUNT(*) FROM exercices WHERE professeur_id = :prof_id"),
+            {"prof_id": professeur_id},
+        ).scalar()
+    return db.execute(text("SELECT COUNT(*) FROM exercices")).scalar()
  
 
 def get_student_data(db, eleve_id):
@@ -581,6 +893,8 @@ def get_student_global_performance(db, eleve_id, professeur_id):
         AND ex.professeur_id = :prof_id
     GROUP BY
         e.id, ex.id
+    ORDER BY
+        ex.id
     """)
     
     student_data = db.execute(student_query, {
@@ -597,18 +911,68 @@ def get_student_global_performance(db, eleve_id, professeur_id):
         "email": student_data[0].email
     }
     
+    performance_str = _format_global_performance(student_data)
+    
+    return eleve_info, performance_str 
+
+
+def _format_global_performance(rows):
     # Format performance data
     performance_details = []
-    for row in student_data:
+    for row in rows:
         if row.exercice_titre:
             score_text = f"Average score: {row.avg_score:.1f}" if row.avg_score else "No scores recorded"
             performance_details.append(
                 f"Exercise: {row.exercice_titre}\n- {row.submission_count} submissions, {score_text}"
             )
     
-    performance_str = "\n".join(performance_details) if performance_details else "No exercise submissions found."
-    
-    return eleve_info, performance_str 
+    return "\n".join(performance_details) if performance_details else "No exercise submissions found."
+
+
+def get_class_global_performance(db, professeur_id):
+    """
+    Student info and formatted performance data of every student of a
+    professor, in one query (same format as get_student_global_performance).
+
+    Returns:
+        dict: {eleve_id: (student_info, performance_str)}
+    """
+    class_query = text("""
+    SELECT 
+        e.id, 
+        e.nom, 
+        e.email,
+        ex.id as exercice_id, 
+        ex.titre as exercice_titre,
+        COUNT(DISTINCT s.id) as submission_count,
+        AVG(r.score) as avg_score
+    FROM 
+        eleves e
+    JOIN 
+        soumissions s ON e.id = s.eleve_id
+    JOIN 
+        exercices ex ON s.exercice_id = ex.id
+    LEFT JOIN 
+        resultats r ON r.eleve_id = s.eleve_id AND r.exercice_id = s.exercice_id
+    WHERE 
+        ex.professeur_id = :prof_id
+    GROUP BY
+        e.id, ex.id
+    ORDER BY
+        e.id, ex.id
+    """)
+
+    rows_by_student = {}
+    for row in db.execute(class_query, {"prof_id": professeur_id}).fetchall():
+        rows_by_student.setdefault(row.id, []).append(row)
+
+    return {
+        eleve_id: (
+            {"nom_eleve": rows[0].nom, "email": rows[0].email},
+            _format_global_performance(rows),
+        )
+        for eleve_id, rows in rows_by_student.items()
+    }
 
 
 def verify_exam_belongs_to_professor(db, exam_id, professor_id):
@@ -643,98 +1007,118 @@ def verify_student_access(db, student_id, professor_id):
     
     return result.count > 0
 
-def get_exam_results_for_professor(db, exam_id, professor_id):
-    """Get all student results for a specific exam/exercise"""
-    query = text("""
-        SELECT e.nom as student, 
-               CAST((r.score * 100.0) / (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) AS INTEGER) as score,
-               MAX(strftime('%Y-%m-%d', s.date_soumission)) as submission_date,
-               (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) as total_questions,
-               CASE 
-                   WHEN r.score >= (SELECT COUNT(*) FROM soumissions WHERE exercice_id = :exam_id AND eleve_id = e.id) * 0.7 THEN 'PASSED'
+def format_date(value):
+    """
+    Format a date column as YYYY-MM-DD. Raw SQL returns datetimes on
+    PostgreSQL and ISO strings on SQLite.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return value.strftime("%Y-%m-%d")
+
+def get_exam_results_for_professor(db, exam_id, professor_id, limit=None, cursor=None, fields=None):
+    """
+    Get all student results for a specific exam/exercise, graded and pending
+    students together, most recent submission first.
+
+    Question counts and last submission date are aggregated once per student,
+    then joined to the results: a single pass over the exam's submissions.
+
+    Returns:
+        tuple: (list of results, next cursor or None)
+    """
+    fields = parse_fields(fields, EXAM_RESULT_FIELDS)
+    after = decode_cursor(cursor, 2)
+    params = {"exam_id": exam_id, "prof_id": professor_id}
+    keyset = ""
+    if after:
+        keyset = "WHERE (c.submission_date, c.eleve_id) < (:after_date, :after_id)"
+        params.update(after_date=after[0], after_id=after[1])
+    limit_clause = _limit_clause(limit, params)
+
+    query = text(f"""
+        WITH copies AS (
+            SELECT s.eleve_id,
+                   COUNT(*) AS total_questions,
+                   MAX(s.date_soumission) AS submission_date
+            FROM soumissions s
+            JOIN exercices ex ON ex.id = s.exercice_id
+            WHERE s.exercice_id = :exam_id
+            AND ex.professeur_id = :prof_id
+            GROUP BY s.eleve_id
+        )
+        SELECT c.eleve_id,
+               e.nom as student,
+               CASE
+                   WHEN r.id IS NULL THEN 0
+                   ELSE CAST((r.score * 100.0) / c.total_questions AS INTEGER)
+               END as score,
+               c.submission_date,
+               c.total_questions,
+               CASE
+                   WHEN r.id IS NULL THEN 'PENDING'
+                   WHEN r.score >= c.total_questions * 0.7 THEN 'PASSED'
                    ELSE 'NEEDS IMPROVEMENT'
                END as status
-        FROM resultats r
-        JOIN eleves e ON r.eleve_id = e.id
-        JOIN exercices ex ON r.exercice_id = ex.id
-        JOIN professeurs p ON ex.professeur_id = p.id
-        JOIN soumissions s ON r.eleve_id = s.eleve_id AND r.exercice_id = s.exercice_id
-        WHERE p.id = :prof_id
-        AND r.exercice_id = :exam_id
-        GROUP BY e.id
-        ORDER BY MAX(s.date_soumission) DESC
+        FROM copies c
+        JOIN eleves e ON e.id = c.eleve_id
+        LEFT JOIN resultats r ON r.eleve_id = c.eleve_id AND r.exercice_id = :exam_id
+        {keyset}
+        ORDER BY c.submission_date DESC, c.eleve_id DESC
+        {limit_clause}
     """)
     
-    result = db.execute(query, {"exam_id": exam_id, "prof_id": professor_id}).fetchall()
-    
+    result = db.execute(query, params).fetchall()
+    result, next_cursor = keyset_page(result, limit, lambda row: (row.submission_date, row.eleve_id))
+
     # Convert to list of dictionaries
-    return [
-        {
-            "student": row.student,
-            "score": row.score,
-            "submission_date": row.submission_date,
-            "status": row.status
-        } 
-        for row in result
-    ]
+    items = []
+    for row in result:
+        item = _project(row, fields)
+        if "submission_date" in item:
+            item["submission_date"] = format_date(row.submission_date)
+        items.append(item)
+    return items, next_cursor
+
 
-def get_pending_submissions(db, exam_id):
-    """Get submissions that haven't been graded yet"""
-    submissions_query = text("""
-        SELECT e.nom as student,
-               0 as score,
-               strftime('%Y-%m-%d', s.date_soumission) as submission_date,
-               'PENDING' as status
+def count_exam_results(db, exam_id, professor_id):
+    """Number of students listed by get_exam_results_for_professor"""
+    return db.execute(text("""
+        SELECT COUNT(DISTINCT s.eleve_id)
         FROM soumissions s
-        JOIN eleves e ON s.eleve_id = e.id
-        LEFT JOIN resultats r ON r.eleve_id = s.eleve_id AND r.exercice_id = s.exercice_id
-        WHERE s.exercice_id = :exam_id AND r.id IS NULL
-        GROUP BY s.eleve_id
-        ORDER BY s.date_soumission DESC
-    """)
-    
-    result = db.execute(submissions_query, {"exam_id": exam_id}).fetchall()
-    
-    return [
-        {
-            "student": row.student,
-            "score": row.score,
-            "submission_date": row.submission_date,
-            "status": row.status
-        } 
-        for row in result
-    ]
+        JOIN exercices ex ON ex.id = s.exercice_id
+        JOIN eleves e ON e.id = s.eleve_id
+        WHERE s.exercice_id = :exam_id
+        AND ex.professeur_id = :prof_id
+    """), {"exam_id": exam_id, "prof_id": professor_id}).scalar()
 
-def get_exams_for_professor(db, professor_id):
-    """Get list of exercises formatted as exams for the dashboard"""
-    query = text("""
+def get_exams_for_professor(db, professor_id, limit=None, cursor=None, fields=None):
+    """
+    Get list of exercises formatted as exams for the dashboard
+
+    Returns:
+        tuple: (list of exams, next cursor or None)
+    """
+    fields = parse_fields(fields, EXAM_FIELDS)
+    after = decode_cursor(cursor, 2)
+    params = {"prof_id": professor_id}
+    keyset = ""
+    if after:
+        keyset = "AND (COALESCE(e.titre, ''), e.id) < (:after_titre, :after_id)"
+        params.update(after_titre=after[0], after_id=after[1])
+    limit_clause = _limit_clause(limit, params)
+
+    query = text(f"""
         SELECT e.id, e.titre as name
         FROM exercices e
         WHERE e.professeur_id = :prof_id
-        ORDER BY e.titre DESC
+        {keyset}
+        ORDER BY COALESCE(e.titre, '') DESC, e.id DESC
+        {limit_clause}
     """)
     
-    result = db.execute(query, {"prof_id": professor_id}).fetchall()
-    
-    return [{"id": row.id, "name": row.name} for row in result] 
-
-
-def add_missing_columns(engine):
-    """Add missing columns to existing tables without recreating the database"""
-    try:
-        # Get inspector to check existing columns
-        inspector = inspect(engine)
-        
-        # Check if file_path column exists in programmes table
-        existing_columns = [col['name'] for col in inspector.get_columns('programmes')]
-        
-        if 'file_path' not in existing_columns:
-            # Add the missing column
-            with engine.begin() as conn:
-                conn.execute(text("ALTER TABLE programmes ADD COLUMN file_path VARCHAR"))
-                print("Added file_path column to programmes table")
-        
-        # Check for other missing columns as needed
-        
-    except Exception as e:
-        print(f"Error updating database schema: {e}")
\ No newline at end of file
+    result = db.execute(query, params).fetchall()
+    result, next_cursor = keyset_page(result, limit, lambda row: (row.name or "", row.id))
+    return [_project(row, fields) for row in result], next_cursor
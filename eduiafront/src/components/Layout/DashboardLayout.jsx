@@ -28,7 +28,7 @@ import {
   useToast,
   VStack
 } from "@chakra-ui/react";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   FiBarChart2,
   FiCheckCircle,
@@ -45,6 +45,9 @@ import { useNavigate } from "react-router-dom";
 import api from "../../services/api";
 import CurriculumUpload from "../CurriculumUpload";
 import EventMessage from "../common/EventMessage";
+
+const GRADING_POLL_INTERVAL_MS = 1000;
+const GRADING_MAX_WAIT_MS = 10 * 60 * 1000;
   
 const CorrectExam = () => {
   const [file, setFile] = useState(null);
@@ -89,6 +92,31 @@ const CorrectExam = () => {
     setFile(event.target.files[0]);
   };
 
+  // Stop polling grading jobs once the page is left
+  const unmounted = useRef(false);
+  useEffect(() => {
+    unmounted.current = false;
+    return () => {
+      unmounted.current = true;
+    };
+  }, []);
+
+  // Grading runs as a background job on the API: poll until it finishes,
+  // gives up after GRADING_MAX_WAIT_MS or when the component unmounts
+  const waitForGradingJob = async (jobId) => {
+    const deadline = Date.now() + GRADING_MAX_WAIT_MS;
+    while (!unmounted.current) {
+      const { data: job } = await api.get(`/correct-exam/jobs/${jobId}`);
+      if (job.status === "done") return job.result;
+      if (job.status === "failed") throw new Error(job.error || "Grading failed");
+      if (Date.now() >= deadline) {
+        throw new Error("Grading is taking too long, check the job again later");
+      }
+      await new Promise((resolve) => setTimeout(resolve, GRADING_POLL_INTERVAL_MS));
+    }
+    return null;
+  };
+
   const handleSubmit = async () => {
     if (!file) return;
     const formData = new FormData();
@@ -97,7 +125,8 @@ const CorrectExam = () => {
     try {
       setIsSubmitting(true);
       const response = await api.post("/correct-exam", formData);
-      const data = response.data;
+      const data = await waitForGradingJob(response.data.job_id);
+      if (!data) return; // page left while grading
       
       // Store all exam data for review
       setExamData(data);
@@ -138,15 +167,18 @@ const CorrectExam = () => {
       }
     } catch (error) {
       console.error("Error during API call:", error);
+      if (unmounted.current) return;
       toast({
         title: "Error",
-        description: "An error occurred while processing the request. Please try again.",
+        description: error.response || !error.message
+          ? "An error occurred while processing the request. Please try again."
+          : error.message,
         status: "error",
         duration: 5000,
         isClosable: true,
       });
     } finally {
-      setIsSubmitting(false);
+      if (!unmounted.current) setIsSubmitting(false);
     }
   };
 
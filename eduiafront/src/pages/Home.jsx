@@ -7,7 +7,7 @@ import ChatBox from "../components/Chat/ChatBox";
 import ChatMessages from "../components/Chat/ChatMessages";
 import AppLayout from "../components/Layout/AppLayout";
 import Navbar from "../components/Layout/Navbar";
-import api from "../services/api";
+import api, { streamChat } from "../services/api";
 
 const Home = ({ isAuthenticated, setIsAuthenticated }) => {
   const [canLogin, setCanLogin] = useState(false);
@@ -22,6 +22,8 @@ const Home = ({ isAuthenticated, setIsAuthenticated }) => {
   };
 
   const handleLogout = () => {
+    // Révoque le jeton côté serveur, la déconnexion locale n'attend pas la réponse
+    api.post("/logout/").catch(() => {});
     localStorage.removeItem("token");
     setIsAuthenticated(false);
     setUsername("");
@@ -82,17 +84,25 @@ const Home = ({ isAuthenticated, setIsAuthenticated }) => {
       // Add user message immediately for better UX
       setMessages((prev) => [...prev, userMessage]);
 
-      // Appelez l'endpoint /chat/ pour obtenir la réponse
-      const response = await api.post("/chat/", { message: userText });
-      const botResponse = response.data.response;
-      const botMessage = { 
-        sender: "bot", 
-        text: botResponse,
-        formattedText: formatBotResponse(botResponse) 
-      };
+      // Réponse du bot affichée au fil du streaming de /chat/stream
+      setMessages((prev) => [...prev, { sender: "bot", text: "", formattedText: "" }]);
+      const updateBotMessage = (botResponse) =>
+        setMessages((prev) => [
+          ...prev.slice(0, -1),
+          {
+            sender: "bot",
+            text: botResponse,
+            formattedText: formatBotResponse(botResponse)
+          }
+        ]);
 
-      // Mise à jour de l'état des messages
-      setMessages((prev) => [...prev, botMessage]);
+      const botResponse = await streamChat(userText, {
+        onToken: (partial) => {
+          setIsLoading(false);
+          updateBotMessage(partial);
+        }
+      });
+      updateBotMessage(botResponse);
     } catch (error) {
       console.error("Erreur lors de l'envoi du message :", error);
       // Add error message to show to the user
@@ -102,7 +112,8 @@ const Home = ({ isAuthenticated, setIsAuthenticated }) => {
       );
       // Add error message as bot response
       setMessages((prev) => [
-        ...prev, 
+        // Drop the empty placeholder of an interrupted stream
+        ...prev.filter((msg) => msg.sender !== "bot" || msg.text), 
         { 
           sender: "bot", 
           text: "Désolé, je n'ai pas pu traiter votre demande. Veuillez réessayer.", 
@@ -15,4 +15,43 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Génération en streaming (/chat/stream, server-sent events)
+export async function streamChat(message, { onExercise, onToken } = {}) {
+  const token = localStorage.getItem("token");
+  const response = await fetch(api.defaults.baseURL + "/chat/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: "Bearer " + token } : {}),
+    },
+    body: JSON.stringify({ message }),
+  });
+  if (!response.ok) {
+    throw new Error("Erreur " + response.status);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let text = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+      if (event === "exercise") onExercise?.(data);
+      if (event === "token") {
+        text += data.text;
+        onToken?.(text);
+      }
+      if (event === "error") throw new Error(data.detail);
+    }
+  }
+  return text;
+}
+
 export default api;